@@ -0,0 +1,77 @@
+import argparse
+import datetime
+import time
+
+from src.model.scripts.dim_date import DimDate
+from src.model.scripts.dim_time import DimTime
+
+
+RANGES = [
+    (datetime.datetime(2000, 1, 1), datetime.datetime(2049, 12, 31)),
+    (datetime.datetime(1900, 1, 1), datetime.datetime(2200, 12, 31))
+]
+
+
+def run_benchmark(start: datetime.datetime, end: datetime.datetime, repeat: int) -> tuple[int, float]:
+    """
+    Builds the date dimension repeat times and returns the number of rows
+    and the best wall time.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        dim_date = DimDate(start=start, end=end)
+        rows = len(dim_date.dataframe.index)
+        timings.append(time.perf_counter() - start_time)
+
+    return rows, min(timings)
+
+
+def run_time_benchmark(grain: str, repeat: int) -> tuple[int, float]:
+    """
+    Builds the time dimension repeat times and returns the number of rows
+    and the best wall time.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        dim_time = DimTime(grain=grain)
+        rows = len(dim_time.dataframe.index)
+        timings.append(time.perf_counter() - start_time)
+
+    return rows, min(timings)
+
+
+def main() -> None:
+    """
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark building the date dimension for the default "
+        + "range 2000-2049 and the range 1900-2200, and the time dimension "
+        + "at the grains second, minute and 15-minute."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of runs, the best run is reported. Default is 3"
+    )
+    args = parser.parse_args()
+
+    print(f"{'range':<12} {'rows':>8} {'seconds':>8} {'rows/s':>12}")
+
+    for start, end in RANGES:
+        rows, elapsed = run_benchmark(start, end, args.repeat)
+        print(f"{start.year}-{end.year:<7} {rows:>8} {elapsed:>8.3f} {rows / elapsed:>12,.0f}")
+
+    print(f"\n{'grain':<12} {'rows':>8} {'seconds':>8} {'rows/s':>12}")
+
+    for grain in ("second", "minute", "15-minute"):
+        rows, elapsed = run_time_benchmark(grain, args.repeat)
+        print(f"{grain:<12} {rows:>8} {elapsed:>8.3f} {rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
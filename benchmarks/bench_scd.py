@@ -0,0 +1,387 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import (
+    Callable,
+    Optional
+)
+
+import numpy as np
+import pandas as pd
+
+from src.model.notebooks.scd import (
+    CHECKSUM_METHODS,
+    add_scd2_checksum_column,
+    apply_scd_updates,
+    calculate_md5_hash,
+    scd1,
+    scd2,
+    scd_fused
+)
+
+
+KEY = "id"
+SCD1_COLUMNS = ["name"]
+SCD2_COLUMNS = ["city", "segment", "revenue", "visits"]
+DEFAULT_ROWS = [100_000, 1_000_000, 10_000_000]
+
+
+def make_dataframe(rows: int, width: int = 0, seed: int = 0, first_key: int = 0) -> pd.DataFrame:
+    """
+    Creates synthetic rows with string, float and integer columns and width
+    further string columns.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Customer {i}" for i in range(10_000)], dtype=object)
+    cities = np.array(["Stuttgart", "Karlsruhe", "Mannheim", "Freiburg", "Heidelberg", "Ulm"], dtype=object)
+    attributes = np.array([f"Value {i}" for i in range(100)], dtype=object)
+
+    dataframe = pd.DataFrame({
+        KEY: np.arange(first_key, first_key + rows),
+        "name": names.take(rng.integers(0, len(names), rows)),
+        "city": cities.take(rng.integers(0, len(cities), rows)),
+        "segment": rng.integers(0, 20, rows).astype(str).astype(object),
+        "revenue": rng.random(rows).round(2) * 1000,
+        "visits": rng.integers(0, 500, rows)
+    })
+
+    for number in range(width):
+        dataframe[f"attribute_{number}"] = attributes.take(rng.integers(0, len(attributes), rows))
+
+    return dataframe
+
+
+def scd2_columns(width: int) -> list[str]:
+    return SCD2_COLUMNS + [f"attribute_{number}" for number in range(width)]
+
+
+def make_dimension(rows: int, width: int = 0, history_rate: float = 0.1, seed: int = 0) -> pd.DataFrame:
+    """
+    Creates a synthetic dimension with rows active versions. A share of
+    history_rate of the keys has an additional closed version.
+    """
+    dimension = make_dataframe(rows, width, seed)
+    dimension.insert(0, "sk", [f"sk-{i}" for i in range(rows)])
+    dimension["effective_from"] = "2020-01-01"
+    dimension["effective_till"] = "9999-12-31"
+    dimension["active_flag"] = 1
+
+    history = dimension.sample(frac=history_rate, random_state=seed).copy()
+    history["sk"] = "sk-h-" + history[KEY].astype(str)
+    history["visits"] = history["visits"] + 1000
+    history["effective_from"] = "2019-01-01"
+    history["effective_till"] = "2019-12-31"
+    history["active_flag"] = 0
+
+    return pd.concat([dimension, history], axis=0, ignore_index=True).sample(frac=1, random_state=seed)
+
+
+def make_staging(
+        dimension: pd.DataFrame,
+        staging_rate: float = 0.1,
+        change_rate: float = 0.2,
+        scd1_rate: float = 0.2,
+        insert_rate: float = 0.1,
+        seed: int = 0
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Creates a staging delta for a synthetic dimension and the expected
+    dimension after the load, without surrogate keys. Closed versions end
+    yesterday, new versions start today and end at 9999-12-31.
+
+    A share of staging_rate of the active keys is staged, of these a share
+    of change_rate gets changed SCD2 columns and a share of scd1_rate a
+    changed SCD1 column. insert_rate new keys per staged key are added.
+    """
+    rng = np.random.default_rng(seed + 1)
+    active = dimension[dimension["active_flag"] == 1]
+    width = len([column for column in dimension.columns if column.startswith("attribute_")])
+
+    staging = active.sample(frac=staging_rate, random_state=seed + 1)
+    staging = staging.drop(columns=["sk", "effective_from", "effective_till", "active_flag"]).reset_index(drop=True)
+    staged = len(staging.index)
+    changed = rng.random(staged) < change_rate
+    renamed = rng.random(staged) < scd1_rate
+    staging.loc[changed, "visits"] = staging.loc[changed, "visits"] + 1
+    staging.loc[renamed, "name"] = "Renamed " + staging.loc[renamed, KEY].astype(str)
+
+    inserted = make_dataframe(int(staged * insert_rate), width, seed + 2, first_key=int(dimension[KEY].max()) + 1)
+
+    # The expected dimension: renamed keys in all versions, changed keys closed and opened again
+    expected = dimension.drop(columns=["sk"])
+    names = staging[renamed].set_index(KEY)["name"]
+    expected["name"] = expected[KEY].map(names).fillna(expected["name"])
+
+    closed = expected[KEY].isin(staging.loc[changed, KEY]) & (expected["active_flag"] == 1)
+    expected.loc[closed, "active_flag"] = 0
+    expected.loc[closed, "effective_till"] = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+
+    opened = pd.concat([staging[changed], inserted], axis=0)
+    opened = opened.assign(
+        effective_from=datetime.date.today().isoformat(),
+        effective_till="9999-12-31",
+        active_flag=1
+    )
+    expected = pd.concat([expected, opened], axis=0, ignore_index=True)
+    staging = pd.concat([staging, inserted], axis=0, ignore_index=True)
+
+    return staging, expected
+
+
+def iso_dates(dates: pd.Series) -> pd.Series:
+    """
+    Returns dates, ISO date strings or days since 1970-01-01, like typed
+    dates of scd_fused, as ISO date strings.
+    """
+    if pd.api.types.is_integer_dtype(dates.dtype):
+        return pd.Series(dates.to_numpy().astype("datetime64[D]").astype(str), index=dates.index)
+
+    return dates.astype(str)
+
+
+def check_result(result: Optional[pd.DataFrame], expected: pd.DataFrame) -> bool:
+    """
+    Compares a result of a SCD load with the expected dimension, ignoring
+    surrogate keys and the order of the rows. Validity dates are compared as
+    ISO date strings.
+    """
+    if result is None:
+        return False
+
+    columns = list(expected.columns)
+    order = [KEY, "active_flag", "effective_from"]
+    result = result.assign(
+        effective_from=iso_dates(result["effective_from"]),
+        effective_till=iso_dates(result["effective_till"])
+    )
+
+    try:
+        pd.testing.assert_frame_equal(
+            result[columns].sort_values(order).reset_index(drop=True),
+            expected.sort_values(order).reset_index(drop=True),
+            check_dtype=False
+        )
+    except (AssertionError, KeyError):
+        return False
+
+    return True
+
+
+def legacy_checksums(dataframe: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Row-wise checksums as calculated by add_scd2_checksum_column before the
+    batched methods, used as reference.
+    """
+    return dataframe.loc[:, columns].apply(lambda row: calculate_md5_hash(row), axis=1)
+
+
+def measure(function: Callable, repeat: int, memory: bool) -> tuple[object, dict]:
+    """
+    Runs function repeat times and returns its result with the best wall
+    time and, with memory=True, the peak of the memory allocated by a
+    further run traced by tracemalloc.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    stats = {"seconds": round(min(timings), 4)}
+
+    if memory:
+        result = None
+        tracemalloc.start()
+
+        try:
+            result = function()
+            stats["peak_mib"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        finally:
+            tracemalloc.stop()
+
+    return result, stats
+
+
+def run_scenario(rows: int, args: argparse.Namespace) -> dict:
+    """
+    Generates a dimension with rows active versions and a staging delta, and
+    times every stage of the SCD load.
+    """
+    dimension = make_dimension(rows, args.width, args.history_rate, args.seed)
+    staging, expected = make_staging(
+        dimension,
+        args.staging_rate,
+        args.change_rate,
+        args.scd1_rate,
+        args.insert_rate,
+        args.seed
+    )
+    columns = scd2_columns(args.width)
+    stages = {}
+    checks = {}
+
+    def run(name: str, function: Callable) -> object:
+        result, stages[name] = measure(function, args.repeat, not args.no_memory)
+        print(f"{rows:>10} {name:<20} {stages[name]['seconds']:>8.3f}", file=sys.stderr)
+        return result
+
+    for method in args.methods or CHECKSUM_METHODS:
+        run(f"checksum_{method}", lambda: add_scd2_checksum_column(
+            dimension, "scd2_checksum", columns, method=method, workers=args.workers
+        ))
+
+    if args.legacy:
+        run("checksum_legacy", lambda: legacy_checksums(dimension, columns))
+
+    result = run("scd1", lambda: scd1(dimension, staging, KEY, SCD1_COLUMNS))
+    result = run("scd2", lambda: scd2(result, staging, KEY, columns))
+    checks["scd2"] = check_result(result, expected)
+
+    result = run("scd_fused", lambda: scd_fused(dimension, staging, KEY, SCD1_COLUMNS, columns))
+    checks["scd_fused"] = check_result(result.dataframe if result is not None else None, expected)
+
+    if not args.skip_files:
+        with tempfile.TemporaryDirectory() as directory:
+            dim_file = os.path.join(directory, "dim.csv")
+            stg_file = os.path.join(directory, "stg.csv")
+            dimension.to_csv(dim_file, index=False)
+            staging.to_csv(stg_file, index=False)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                run("apply_scd_updates", lambda: apply_scd_updates(dim_file, stg_file, KEY, SCD1_COLUMNS, columns))
+
+    for stage in stages.values():
+        stage["rows_per_second"] = round(len(dimension.index) / stage["seconds"])
+
+    return {
+        "rows": rows,
+        "dimension_rows": len(dimension.index),
+        "staging_rows": len(staging.index),
+        "stages": stages,
+        "checks": checks
+    }
+
+
+def environment() -> dict:
+    """
+    Describes the versions and the commit the results were measured with.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def compare(results: dict, baseline_file: str) -> None:
+    """
+    Prints the wall time of every stage relative to a previous run.
+    """
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = {scenario["rows"]: scenario for scenario in json.load(file)["scenarios"]}
+
+    print(f"{'rows':>10} {'stage':<20} {'baseline':>8} {'seconds':>8} {'ratio':>6}")
+
+    for scenario in results["scenarios"]:
+        previous = baseline.get(scenario["rows"], {}).get("stages", {})
+
+        for name, stage in scenario["stages"].items():
+            if name in previous:
+                before = previous[name]["seconds"]
+                print(f"{scenario['rows']:>10} {name:<20} {before:>8.3f} {stage['seconds']:>8.3f} {stage['seconds'] / before:>6.2f}")
+
+
+def main() -> None:
+    """
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the SCD checksums, scd1, scd2, the fused load and apply_scd_updates "
+        + "on synthetic dimensions and staging deltas, check the results against the expected "
+        + "dimension and write the timings and peak memory as JSON."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        action="append",
+        help="Active rows of the dimension, can be given multiple times. Default is 100000, 1000000 and 10000000"
+    )
+    parser.add_argument("--width", type=int, default=0, help="Further SCD2 string columns. Default is 0")
+    parser.add_argument("--history-rate", type=float, default=0.1, help="Share of keys with a closed version. Default is 0.1")
+    parser.add_argument("--staging-rate", type=float, default=0.1, help="Share of keys staged. Default is 0.1")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="Share of staged keys with SCD2 changes. Default is 0.2")
+    parser.add_argument("--scd1-rate", type=float, default=0.2, help="Share of staged keys with SCD1 changes. Default is 0.2")
+    parser.add_argument("--insert-rate", type=float, default=0.1, help="New keys per staged key. Default is 0.1")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generators. Default is 0")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of runs, the best run is reported. Default is 1"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Threads for hashing chunks of rows. Default is 0, no thread pool"
+    )
+    parser.add_argument(
+        "--methods",
+        action="append",
+        choices=CHECKSUM_METHODS,
+        help="Checksum methods to time, can be given multiple times. Default is all"
+    )
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the row-wise checksums of the previous implementation"
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Don't trace the peak memory of the stages")
+    parser.add_argument("--skip-files", action="store_true", help="Don't time apply_scd_updates on CSV files")
+    parser.add_argument("-o", "--output", help="JSON file for the results, printed if omitted")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare the timings with")
+    args = parser.parse_args()
+
+    results = {
+        "environment": environment(),
+        "parameters": {name: value for name, value in vars(args).items() if name not in ("output", "compare")},
+        "scenarios": [run_scenario(rows, args) for rows in args.rows or DEFAULT_ROWS]
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if not all(all(scenario["checks"].values()) for scenario in results["scenarios"]):
+        sys.exit("The results of a SCD load differ from the expected dimension")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import filecmp
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as Et
+from concurrent.futures import ProcessPoolExecutor
+
+from src.parser.xml_to_csv import XmlToCsv
+
+
+ROOT_TAG = "export.records.record"
+NODE_TAGS = ["export.records.record.details"]
+LEAF_TAGS = [
+    "export.records.record.id",
+    "export.records.record.header.title",
+    "export.records.record.header.meta.created"
+]
+FILTER_NODE_TAGS = [
+    "export.records.record.details.level1.level2.level3.level4.item",
+    "export.records.record.details.level1.level2.level3.level4.note"
+]
+
+
+def write_synthetic_xml(filename: str, records: int, depth: int = 4, items: int = 5) -> None:
+    """
+    Writes a synthetic XML file with deeply nested records.
+    """
+    levels_open = "".join(f"<level{i}>" for i in range(1, depth + 1))
+    levels_close = "".join(f"</level{i}>" for i in reversed(range(1, depth + 1)))
+
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        file.write('<export xmlns="urn:example:export">\n<records>\n')
+
+        for record in range(records):
+            file.write(
+                f"<record><id>{record}</id>"
+                f"<header><title>Record \"{record}\"</title><meta><created>2023-01-01</created>"
+                f"<ignored>x</ignored></meta></header>"
+                f"<details>{levels_open}"
+                + "".join(f"<item>Item {item}</item><skip>{item}</skip>" for item in range(items))
+                + f"<note>\n  Note for {record}\n</note>{levels_close}</details>"
+                f"<payload><a><b><c>unused</c></b></a></payload></record>\n"
+            )
+
+        file.write("</records>\n</export>\n")
+
+
+def count_events(filename: str) -> int:
+    """
+    Counts the start and end events of a file.
+    """
+    return sum(1 for _ in Et.iterparse(filename, events=("start", "end")))
+
+
+def run_benchmark(filename: str, buffer_size: int, backend: str) -> tuple[float, int]:
+    """
+    Converts the file once and returns the elapsed wall time and the peak
+    resident set size of the process in kilobytes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        parser = XmlToCsv(filename, os.path.join(directory, "output.csv"), backend=backend)
+
+        start = time.perf_counter()
+        parser.convert(ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=buffer_size)
+        elapsed = time.perf_counter() - start
+
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_isolated(filename: str, buffer_size: int, backend: str) -> tuple[float, int]:
+    """
+    Runs the benchmark in a fresh process, so the peak memory of the runs
+    does not influence each other.
+    """
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_benchmark, filename, buffer_size, backend).result()
+
+
+def check_buffering(filename: str, records: int, max_peak_memory: int = 32 * 1024 ** 2) -> None:
+    """
+    Regression check for the output buffering. Converting with a small buffer
+    must produce the same file as a single flush at the end, and the peak
+    memory of the expat backend must not grow with the size of the input.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        expected_file = os.path.join(directory, "expected.csv")
+        XmlToCsv(filename, expected_file).convert(
+            ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=records + 1
+        )
+
+        for background_writes in (False, True):
+            target_file = os.path.join(directory, "output.csv")
+            parser = XmlToCsv(filename, target_file, backend="expat")
+
+            tracemalloc.start()
+            parser.convert(
+                ROOT_TAG,
+                NODE_TAGS,
+                LEAF_TAGS,
+                FILTER_NODE_TAGS,
+                buffer_size=100,
+                background_writes=background_writes
+            )
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            expected_size = os.path.getsize(expected_file)
+            output_size = os.path.getsize(target_file)
+
+            if not filecmp.cmp(expected_file, target_file, shallow=False):
+                raise AssertionError(f"Output differs: {output_size} bytes, expected {expected_size} bytes")
+
+            if peak_memory > max_peak_memory:
+                raise AssertionError(f"Peak memory {peak_memory} bytes exceeds {max_peak_memory} bytes")
+
+            print(
+                f"check ok (background_writes={background_writes}): "
+                f"{output_size} bytes written, peak memory {peak_memory / 1024 ** 2:.1f} MB"
+            )
+
+
+def main() -> None:
+    """
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark XmlToCsv on a synthetic deep-nested XML file "
+        + "and report the throughput in events per second."
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=100_000,
+        help="Number of records in the synthetic file. Default is 100000"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of runs, the best run is reported. Default is 3"
+    )
+    parser.add_argument(
+        "--backend",
+        dest="backends",
+        action="append",
+        choices=XmlToCsv.BACKENDS,
+        help="Backend to benchmark, can be given multiple times. Default is all backends"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only run the regression check of the output buffering"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "synthetic.xml")
+        write_synthetic_xml(filename, args.records)
+
+        if args.check:
+            check_buffering(filename, args.records)
+            return
+
+        results = {}
+
+        for backend in args.backends or XmlToCsv.BACKENDS:
+            # The buffer holds all records, so only a single flush happens at the end
+            runs = [run_isolated(filename, args.records + 1, backend) for _ in range(args.repeat)]
+            results[backend] = min(run[0] for run in runs), max(run[1] for run in runs) / 1024
+
+        # Counted last, the peak memory of this process is inherited by new processes
+        events = count_events(filename)
+
+        print(f"records: {args.records}, events: {events}")
+        print(f"{'backend':<8} {'seconds':>8} {'events/s':>12} {'peak RSS MB':>12}")
+
+        for backend, (elapsed, peak_rss) in results.items():
+            print(f"{backend:<8} {elapsed:>8.3f} {events / elapsed:>12,.0f} {peak_rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
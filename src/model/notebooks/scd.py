@@ -1,20 +1,43 @@
+import binascii
 import datetime
 import hashlib
 import numpy as np
+import os
 import pandas as pd
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
+    NamedTuple,
     Optional,
-    Iterable
+    Iterable,
+    Union
 )
 
+from ...profiling import (
+    Profiler,
+    profile_stage
+)
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+CHECKSUM_METHODS = ("md5", "hash64", "hash128")
+
+SURROGATE_KEYS = ("uuid", "int64", "uuid16")
+
+# Keys of the two independent 64 bit hashes of hash128, hash_pandas_object expects 16 characters
+_HASH_KEYS = ("0123456789123456", "scd2checksum1281")
+
 
 def calculate_md5_hash(row: Iterable[str]) -> str:
     """
     Creates a MD5 hash from an iterable.
     """
-    # Convert all values to string, concatenate and encode before hashing
-    hashable_str = "".join(map(str, row)).encode("utf-8")
+    # Prefix every value with its length, so ("ab", "c") and ("a", "bc") differ
+    hashable_str = "".join(f"{len(value)}:{value}" for value in map(str, row)).encode("utf-8")
 
     # Create a md5 hash from the resulting string
     md5_hash = hashlib.md5(hashable_str).hexdigest()
@@ -22,58 +45,222 @@ def calculate_md5_hash(row: Iterable[str]) -> str:
     return md5_hash
 
 
+def _hex_digests(hashes: list[np.ndarray]) -> np.ndarray:
+    """
+    Converts rows of 64 bit hashes into hexadecimal strings in one pass.
+    """
+    digests = np.column_stack([values.astype(">u8") for values in hashes])
+    width = 16 * len(hashes)
+
+    return np.frombuffer(binascii.hexlify(digests.tobytes()), dtype=f"S{width}").astype(f"U{width}").astype(object)
+
+
+def _normalize_numbers(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts integer columns to float, so a column which turned into float
+    because of missing values after a merge keeps the checksums of its rows.
+    Columns with integers too large for an exact float are left as they are.
+    """
+    result = dataframe
+
+    for position, (_, column) in enumerate(dataframe.items()):
+        if pd.api.types.is_integer_dtype(column.dtype) and not column.abs().max() > 2 ** 53:
+            if result is dataframe:
+                result = dataframe.copy()
+
+            result.isetitem(position, column.to_numpy(dtype="float64", na_value=np.nan))
+
+    return result
+
+
+def _calculate_checksums(dataframe: pd.DataFrame, method: str) -> np.ndarray:
+    """
+    Calculates the checksums of all rows of a dataframe with the given method.
+    """
+    if method == "md5":
+        # Serialize column by column into length prefixed values, then join them per row
+        parts = [
+            [f"{len(value)}:{value}" for value in map(str, column.to_numpy(dtype=object))]
+            for _, column in dataframe.items()
+        ]
+        md5 = hashlib.md5
+
+        return np.array([md5("".join(row).encode("utf-8")).hexdigest() for row in zip(*parts)], dtype=object)
+
+    # Every value is hashed separately and the hashes of a row are combined by position
+    keys = _HASH_KEYS[:1] if method == "hash64" else _HASH_KEYS
+    hashes = [pd.util.hash_pandas_object(dataframe, index=False, hash_key=key).to_numpy() for key in keys]
+
+    return _hex_digests(hashes)
+
+
+def calculate_checksums(
+        dataframe: pd.DataFrame,
+        method: str = "md5",
+        workers: Optional[int] = None,
+        chunk_size: int = 100_000
+) -> pd.Series:
+    """
+    Calculates a checksum for every row of a dataframe as hexadecimal string.
+
+    The method "md5" hashes the values encoded like calculate_md5_hash, "hash64"
+    and "hash128" combine the 64 bit hashes of pandas' hash_pandas_object of
+    every value into a 64 or 128 bit checksum, which is much faster. Integers
+    are hashed like the equal floats. With workers the dataframe is hashed in
+    chunks of chunk_size rows in a thread pool.
+    """
+    if method not in CHECKSUM_METHODS:
+        raise ValueError(f"Unknown checksum method {method!r}, expected one of: {', '.join(CHECKSUM_METHODS)}")
+
+    if not len(dataframe.index):
+        return pd.Series([], index=dataframe.index, dtype=object)
+
+    dataframe = _normalize_numbers(dataframe)
+
+    if not workers or len(dataframe.index) <= chunk_size:
+        checksums = _calculate_checksums(dataframe, method)
+    else:
+        chunks = [dataframe.iloc[start:start + chunk_size] for start in range(0, len(dataframe.index), chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            checksums = np.concatenate(list(executor.map(_calculate_checksums, chunks, [method] * len(chunks))))
+
+    return pd.Series(checksums, index=dataframe.index)
+
+
+def checksum_tag(method: str, columns: Iterable[str]) -> str:
+    """
+    Returns the prefix of the checksums in a checksum column, which records
+    the method and the hashed columns in their order, like "hash64-1a2b3c4d:".
+    """
+    columns_digest = hashlib.md5("\x1f".join(map(str, columns)).encode("utf-8")).hexdigest()[:8]
+
+    return f"{method}-{columns_digest}:"
+
+
 def add_scd2_checksum_column(
         dataframe: pd.DataFrame,
         column_name: str,
-        scd2_columns: Optional[list[str]] = None
+        scd2_columns: Optional[list[str]] = None,
+        method: str = "md5",
+        workers: Optional[int] = None
 ) -> pd.DataFrame:
     """
-    Adds a column to a dataframe with a MD5 hash for every row.
+    Adds a column to a dataframe with a checksum for every row, see
+    calculate_checksums for the methods. The checksums are prefixed with
+    their checksum_tag.
     """
     # If SCD2 columns are specified, filter to just these columns,
-    # otherwise all columns are considered SCD2 columns
-    scd2_dataframe = dataframe.loc[:, list(scd2_columns)] if scd2_columns else dataframe
+    # otherwise all columns except the checksum column are considered SCD2 columns
+    scd2_dataframe = _scd2_dataframe(dataframe, column_name, scd2_columns)
 
-    # Calculate checksum (md5 hash) for SCD2 columns per row
-    md5_hashes_series = scd2_dataframe.apply(lambda row: calculate_md5_hash(row), axis=1)
+    # Calculate checksum for SCD2 columns per row
+    checksums_series = calculate_checksums(scd2_dataframe, method=method, workers=workers)
 
     # Copy the input dataframe and add checksum series as a new column
     result = dataframe.copy()
-    result[column_name] = md5_hashes_series
+    result[column_name] = checksum_tag(method, scd2_dataframe.columns) + checksums_series
+
+    return result
+
+
+def update_scd2_checksum_column(
+        dataframe: pd.DataFrame,
+        column_name: str,
+        scd2_columns: Optional[list[str]] = None,
+        method: str = "md5",
+        workers: Optional[int] = None,
+        verify: bool = False
+) -> pd.DataFrame:
+    """
+    Adds a checksum column to a dimension table, reusing the checksums which
+    are persisted in the column from a previous load. Only rows without a
+    checksum are hashed, or with a checksum of another method or other
+    columns, which is recognized by its checksum_tag. With verify=True all
+    rows are hashed again, persisted checksums which differ are reported and
+    replaced.
+    """
+    if column_name not in dataframe.columns:
+        return add_scd2_checksum_column(dataframe, column_name, scd2_columns, method=method, workers=workers)
+
+    scd2_dataframe = _scd2_dataframe(dataframe, column_name, scd2_columns)
+    tag = checksum_tag(method, scd2_dataframe.columns)
+    persisted = dataframe[column_name]
+
+    if verify:
+        missing = pd.Series(True, index=dataframe.index)
+    else:
+        # Compare the prefixes of all rows at once, missing values don't match as "nan" or "None"
+        prefixes = persisted.to_numpy(dtype=object).astype(f"U{len(tag)}")
+        missing = pd.Series(prefixes != tag, index=dataframe.index)
+        stale = int((missing & persisted.notnull()).sum())
+
+        if stale:
+            print(f"{stale} persisted checksums in column {column_name} are of another method or other columns")
+
+    if not missing.any():
+        return dataframe
+
+    # Calculate checksums only for the rows without a valid persisted checksum
+    checksums_series = tag + calculate_checksums(scd2_dataframe[missing], method=method, workers=workers)
+
+    if verify:
+        differs = persisted.notnull() & (persisted != checksums_series)
+
+        if differs.any():
+            print(f"{differs.sum()} persisted checksums in column {column_name} differ and are replaced")
+
+    result = dataframe.copy()
+    result[column_name] = persisted.where(~missing, checksums_series)
 
     return result
 
 
+def _scd2_dataframe(
+        dataframe: pd.DataFrame,
+        column_name: str,
+        scd2_columns: Optional[list[str]]
+) -> pd.DataFrame:
+    if scd2_columns:
+        return dataframe.loc[:, list(scd2_columns)]
+
+    return dataframe.drop(columns=[column_name], errors="ignore")
+
+
 def scd1(
         df_dim: pd.DataFrame,
         df_stg: pd.DataFrame,
         key: str,
-        scd1_columns: Optional[list[str]] = None
+        scd1_columns: Optional[list[str]] = None,
+        profiler: Optional[Profiler] = None
 ) -> Optional[pd.DataFrame]:
     """
     """
     try:
-        df_merged = pd.merge(
-            df_dim,
-            df_stg,
-            how="left",
-            on=key,
-            suffixes=("", "_stg"),
-            indicator=True,
-            validate="m:1"
-        )
-
-        # Update SCD1 columns in dimension table
-        for column in scd1_columns:
-            dim_column_name = f"{column}"
-            stg_column_name = f"{column}_stg"
-
-            dim_column = df_merged[dim_column_name]
-            stg_column = df_merged[stg_column_name]
-            merge_info = df_merged["_merge"]
-
-            scd1_condition = (dim_column != stg_column) & (merge_info == "both")
-            df_merged.loc[scd1_condition, dim_column_name] = stg_column
+        with profile_stage(profiler, "scd1 merge", rows_in=len(df_dim.index)) as stage:
+            df_merged = pd.merge(
+                df_dim,
+                df_stg,
+                how="left",
+                on=key,
+                suffixes=("", "_stg"),
+                indicator=True,
+                validate="m:1"
+            )
+            stage.rows_out = len(df_merged.index)
+
+        with profile_stage(profiler, "scd1 update", rows_in=len(df_merged.index)):
+            # Update SCD1 columns in dimension table
+            for column in scd1_columns:
+                dim_column_name = f"{column}"
+                stg_column_name = f"{column}_stg"
+
+                dim_column = df_merged[dim_column_name]
+                stg_column = df_merged[stg_column_name]
+                merge_info = df_merged["_merge"]
+
+                scd1_condition = (dim_column != stg_column) & (merge_info == "both")
+                df_merged.loc[scd1_condition, dim_column_name] = stg_column
 
         # Create new dataframe with updated table
         columns = ["_merge"] + [column for column in df_merged.columns if column.endswith("_stg")]
@@ -89,9 +276,22 @@ def scd2(
         df_dim: pd.DataFrame,
         df_stg: pd.DataFrame,
         key: str,
-        scd2_columns: Optional[list[str]] = None
+        scd2_columns: Optional[list[str]] = None,
+        checksum_method: str = "hash64",
+        checksum_workers: Optional[int] = None,
+        persist_checksum: bool = True,
+        verify_checksum: bool = False,
+        profiler: Optional[Profiler] = None
 ) -> Optional[pd.DataFrame]:
     """
+    Applies SCD Type 2 changes of the staging table to the dimension table.
+
+    The checksums of the SCD2 columns are kept in the scd2_checksum column of
+    the result with persist_checksum=True, so the next load only hashes the
+    staging table and the rows of the dimension without a checksum. Persisted
+    checksums of another checksum_method or other scd2_columns are hashed
+    again, verify_checksum=True hashes the whole dimension again and replaces
+    differing checksums. The stages are measured by profiler, if given.
     """
     default_date = datetime.datetime.strptime('9999-12-31', '%Y-%m-%d').date()
     current_date = datetime.datetime.today().date()
@@ -106,64 +306,81 @@ def scd2(
     df_stg_merge["effective_till"] = default_date
     df_stg_merge["active_flag"] = 1
 
-    # Calculate checksums for SCD2 columns in both the dimension and staging table
-    df_dim_merge = add_scd2_checksum_column(
-        df_dim_merge,
-        column_name="scd2_checksum",
-        scd2_columns=scd2_columns
-    )
-
-    df_stg_merge = add_scd2_checksum_column(
-        df_stg_merge,
-        column_name="scd2_checksum",
-        scd2_columns=scd2_columns
-    )
-
-    try:
-        df_merged = pd.merge(
+    # Calculate checksums for SCD2 columns in both the dimension and staging table,
+    # persisted checksums of the dimension table are reused
+    with profile_stage(profiler, "scd2 checksums", rows_in=len(df_dim_merge.index) + len(df_stg_merge.index)):
+        df_dim_merge = update_scd2_checksum_column(
             df_dim_merge,
-            df_stg_merge,
-            how="outer",
-            on=key,
-            suffixes=("", "_stg"),
-            validate="m:1"
+            column_name="scd2_checksum",
+            scd2_columns=scd2_columns,
+            method=checksum_method,
+            workers=checksum_workers,
+            verify=verify_checksum
         )
 
-        # Flag each row with SCD2 actions to be performed
-        hash_dim = df_merged["scd2_checksum"]
-        hash_stg = df_merged["scd2_checksum_stg"]
-
-        conditions = [
-            (hash_dim != hash_stg) & hash_dim.notnull() & hash_stg.notnull(),
-            (hash_dim != hash_stg) & hash_dim.isnull() & hash_stg.notnull()
-        ]
-        choices = [
-            "UPSERT",
-            "INSERT"
-        ]
-
-        df_merged["scd2_action_stg"] = np.select(conditions, choices, default=None)
-        df_merged = df_merged.drop(["scd2_checksum", "scd2_checksum_stg"], axis=1)
-
-        # TBD.
-        df_no_action = df_merged[df_merged["scd2_action_stg"].isnull()]
-        df_no_action = df_no_action.drop(["scd2_action_stg"], axis=1)
-
-        # TBD.
-        df_insert = df_merged[df_merged["scd2_action_stg"] == "INSERT"]
-        df_insert = df_insert.drop(["scd2_action_stg"], axis=1)
-
-        # TBD.
-        df_upsert = df_merged[df_merged["scd2_action_stg"] == "UPSERT"]
-        df_upsert = df_upsert.drop(["scd2_action_stg"], axis=1)
+        df_stg_merge = add_scd2_checksum_column(
+            df_stg_merge,
+            column_name="scd2_checksum",
+            scd2_columns=scd2_columns,
+            method=checksum_method,
+            workers=checksum_workers
+        )
 
-        result = [
-            df_dim[df_dim["active_flag"] == 0],
-            no_action_handler(df_no_action),
-            insert_handler(df_insert, key),
-            upsert_handler(df_upsert, key)
-        ]
-        result = pd.concat(result, axis=0).sort_values(by=[key, "active_flag"])
+    try:
+        with profile_stage(profiler, "scd2 merge", rows_in=len(df_dim_merge.index)) as stage:
+            df_merged = pd.merge(
+                df_dim_merge,
+                df_stg_merge,
+                how="outer",
+                on=key,
+                suffixes=("", "_stg"),
+                validate="m:1"
+            )
+            stage.rows_out = len(df_merged.index)
+
+        with profile_stage(profiler, "scd2 classify", rows_in=len(df_merged.index)):
+            # Flag each row with SCD2 actions to be performed
+            hash_dim = df_merged["scd2_checksum"]
+            hash_stg = df_merged["scd2_checksum_stg"]
+
+            conditions = [
+                (hash_dim != hash_stg) & hash_dim.notnull() & hash_stg.notnull(),
+                (hash_dim != hash_stg) & hash_dim.isnull() & hash_stg.notnull()
+            ]
+            choices = [
+                "UPSERT",
+                "INSERT"
+            ]
+
+            df_merged["scd2_action_stg"] = np.select(conditions, choices, default=None)
+
+        # The checksums are written with the rows by the handlers if they are persisted
+        if not persist_checksum:
+            df_merged = df_merged.drop(["scd2_checksum", "scd2_checksum_stg"], axis=1)
+
+        with profile_stage(profiler, "scd2 handlers", rows_in=len(df_merged.index)):
+            # TBD.
+            df_no_action = df_merged[df_merged["scd2_action_stg"].isnull()]
+            df_no_action = df_no_action.drop(["scd2_action_stg"], axis=1)
+
+            # TBD.
+            df_insert = df_merged[df_merged["scd2_action_stg"] == "INSERT"]
+            df_insert = df_insert.drop(["scd2_action_stg"], axis=1)
+
+            # TBD.
+            df_upsert = df_merged[df_merged["scd2_action_stg"] == "UPSERT"]
+            df_upsert = df_upsert.drop(["scd2_action_stg"], axis=1)
+
+            result = [
+                df_dim[df_dim["active_flag"] == 0],
+                no_action_handler(df_no_action),
+                insert_handler(df_insert, key),
+                upsert_handler(df_upsert, key)
+            ]
+
+        with profile_stage(profiler, "scd2 concat and sort") as stage:
+            result = pd.concat(result, axis=0).sort_values(by=[key, "active_flag"])
+            stage.rows_out = len(result.index)
     except Exception as error:
         print(error)
         result = None
@@ -229,36 +446,386 @@ def upsert_handler(
     return pd.concat([result_insert, result_update], axis=0)
 
 
+def new_surrogate_keys(
+        count: int,
+        kind: str = "uuid",
+        start: int = 0
+) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """
+    Creates count surrogate keys. "uuid" creates random UUIDs as strings like
+    insert_handler, "int64" a sequence of integers from start and "uuid16"
+    random UUIDs as 16 bytes. uuid16 keys are generated in bulk into one
+    buffer and returned as Arrow fixed_size_binary(16) array, which requires
+    the pyarrow package.
+    """
+    if kind == "int64":
+        return np.arange(start, start + count, dtype="int64")
+
+    if kind == "uuid16":
+        if pa is None:
+            raise ImportError("The pyarrow package is required for uuid16 surrogate keys")
+
+        raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+
+        # Set the version and variant bits like uuid.uuid4
+        raw[:, 6] = raw[:, 6] & 0x0F | 0x40
+        raw[:, 8] = raw[:, 8] & 0x3F | 0x80
+
+        return pd.arrays.ArrowExtensionArray(
+            pa.FixedSizeBinaryArray.from_buffers(pa.binary(16), count, [None, pa.py_buffer(raw)])
+        )
+
+    if kind == "uuid":
+        return np.array([str(uuid.uuid4()) for _ in range(count)], dtype=object)
+
+    raise ValueError(f"Unknown surrogate key {kind!r}, expected one of: {', '.join(SURROGATE_KEYS)}")
+
+
+def to_days(dates: pd.Series) -> np.ndarray:
+    """
+    Converts dates, ISO date strings or datetimes to days since 1970-01-01 as
+    int32, the layout of the Arrow date32 type. Unlike datetime64[ns] of
+    pandas 1.5, this holds 9999-12-31.
+    """
+    if pd.api.types.is_integer_dtype(dates.dtype):
+        return dates.to_numpy(dtype="int32")
+
+    if pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        return dates.to_numpy().astype("datetime64[D]").astype("int32")
+
+    return np.array(dates.astype(str).str[:10].to_numpy(), dtype="datetime64[D]").astype("int32")
+
+
+class ScdResult(NamedTuple):
+    """
+    Updated dimension table and the number of staged keys per action.
+    """
+    dataframe: pd.DataFrame
+    unchanged: int
+    scd1: int
+    scd2: int
+    inserted: int
+
+
+def _values(series: pd.Series) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """
+    Returns the values of a column as NumPy array, or as extension array if
+    they have an extension dtype.
+    """
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+
+def _is_sorted(keys: np.ndarray, flags: np.ndarray) -> bool:
+    """
+    Returns whether rows are sorted by key and flag.
+    """
+    if len(keys) < 2:
+        return True
+
+    try:
+        before, after = keys[:-1], keys[1:]
+        return bool(((before < after) | ((before == after) & (flags[:-1] <= flags[1:]))).all())
+    except TypeError:
+        return False
+
+
+def _scatter(
+        dim_values: Union[np.ndarray, pd.api.extensions.ExtensionArray],
+        dim_slots: np.ndarray,
+        new_values: Union[np.ndarray, pd.api.extensions.ExtensionArray],
+        new_slots: np.ndarray
+) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """
+    Returns the values of a result column, the dimension values at the rows
+    dim_slots and the new values at the rows new_slots. NumPy values are
+    written into one preallocated array.
+    """
+    if isinstance(dim_values, np.ndarray) and isinstance(new_values, np.ndarray):
+        try:
+            dtype = np.result_type(dim_values, new_values) if len(new_values) else dim_values.dtype
+        except TypeError:
+            dtype = np.dtype(object)
+
+        values = np.empty(len(dim_slots) + len(new_slots), dtype=dtype)
+        values[dim_slots] = dim_values
+        values[new_slots] = new_values
+
+        return values
+
+    # Extension arrays are concatenated by pandas and put into order
+    order = np.empty(len(dim_slots) + len(new_slots), dtype="int64")
+    order[dim_slots] = np.arange(len(dim_slots))
+    order[new_slots] = np.arange(len(dim_slots), len(order))
+
+    return pd.concat([pd.Series(dim_values), pd.Series(new_values)], ignore_index=True).array.take(order)
+
+
+def scd_fused(
+        df_dim: pd.DataFrame,
+        df_stg: pd.DataFrame,
+        key: str,
+        scd1_columns: Optional[list[str]] = None,
+        scd2_columns: Optional[list[str]] = None,
+        checksum_method: str = "hash64",
+        checksum_workers: Optional[int] = None,
+        persist_checksum: bool = True,
+        verify_checksum: bool = False,
+        current_date: Optional[datetime.date] = None,
+        surrogate_key: str = "uuid",
+        typed_dates: bool = False,
+        profiler: Optional[Profiler] = None,
+        raise_errors: bool = False
+) -> Optional[ScdResult]:
+    """
+    Applies SCD Type 1 and Type 2 changes like scd1 followed by scd2, but
+    aligns the dimension and the staging table only once by key.
+
+    Every staged key is classified as unchanged, SCD1 only (SCD1 columns
+    changed), SCD2 (checksum changed, a new version is opened) or new. The
+    result holds the dimension rows once, with SCD1 updates applied and
+    closed versions updated in place, and the new versions, sorted by key
+    and active_flag. Rows are addressed by position, so the index of the
+    dimension doesn't matter. The columns keep their types.
+
+    The result is written column by column into preallocated arrays, only
+    the columns which change are copied before. If the dimension is sorted
+    already, like a previous result, the new versions are merged into it
+    instead of sorting the result.
+
+    New versions get surrogate keys of the kind surrogate_key, see
+    new_surrogate_keys, "int64" continues after the largest key of the
+    dimension. With typed_dates=True effective_from and effective_till are
+    held as days since 1970-01-01, see to_days, instead of date objects.
+    The stages are measured by profiler, if given.
+
+    Errors are printed and None is returned, with raise_errors=True they are
+    raised to the caller instead.
+    """
+    default_date = datetime.datetime.strptime('9999-12-31', '%Y-%m-%d').date()
+    current_date = current_date or datetime.datetime.today().date()
+    closed_date = current_date - datetime.timedelta(days=1)
+
+    if typed_dates:
+        current_date, default_date, closed_date = (
+            np.array([current_date, default_date, closed_date], dtype="datetime64[D]").astype("int32")
+        )
+
+    try:
+        with profile_stage(profiler, "fused align and scd1", rows_in=len(df_dim.index)):
+            stg_keys = pd.Index(df_stg[key])
+
+            if not stg_keys.is_unique:
+                raise ValueError("Merge keys are not unique in right dataset; not a many-to-one merge")
+
+            # Position of the staging row of every dimension row, -1 without one
+            positions = stg_keys.get_indexer(df_dim[key])
+
+            # Values of the dimension columns, replaced by copies only if they change
+            values = {column: _values(df_dim[column]) for column in df_dim.columns}
+
+            if typed_dates:
+                values["effective_from"] = to_days(df_dim["effective_from"])
+                values["effective_till"] = to_days(df_dim["effective_till"])
+
+            scd1_changed = np.zeros(len(df_dim.index), dtype=bool)
+            matched_rows = np.flatnonzero(positions >= 0)
+
+            # Update SCD1 columns of all versions of a staged key, only staged versions are compared
+            for column in scd1_columns or []:
+                dim_values = df_dim[column].to_numpy()
+                dim_matched = dim_values[matched_rows]
+                stg_matched = df_stg[column].to_numpy()[positions[matched_rows]]
+                scd1_condition = dim_matched != stg_matched
+
+                if scd1_condition.any():
+                    updated = np.array(dim_values, dtype=np.result_type(dim_values, stg_matched))
+                    updated[matched_rows[scd1_condition]] = stg_matched[scd1_condition]
+                    values[column] = updated if isinstance(df_dim[column].dtype, np.dtype) else pd.array(
+                        updated, dtype=df_dim[column].dtype
+                    )
+                    scd1_condition &= ~(pd.isnull(dim_matched) & pd.isnull(stg_matched))
+                    scd1_changed[matched_rows[scd1_condition]] = True
+
+        with profile_stage(profiler, "fused checksums", rows_in=len(df_dim.index) + len(df_stg.index)):
+            # Checksums of the active versions, only their SCD2 columns are copied
+            active = (df_dim["active_flag"] == 1).to_numpy()
+            checksum_columns = list(scd2_columns) if scd2_columns else list(df_dim.columns)
+
+            if "scd2_checksum" in df_dim.columns and "scd2_checksum" not in checksum_columns:
+                checksum_columns.append("scd2_checksum")
+
+            df_dim_active = update_scd2_checksum_column(
+                pd.DataFrame({column: values[column][active] for column in checksum_columns}, columns=checksum_columns),
+                column_name="scd2_checksum",
+                scd2_columns=scd2_columns,
+                method=checksum_method,
+                workers=checksum_workers,
+                verify=verify_checksum
+            )
+
+            if scd2_columns:
+                df_stg_scd2 = df_stg.loc[:, list(scd2_columns)]
+            else:
+                df_stg_scd2 = df_stg.assign(effective_from=current_date, effective_till=default_date, active_flag=1)
+
+            hash_stg_all = add_scd2_checksum_column(
+                df_stg_scd2,
+                column_name="scd2_checksum",
+                scd2_columns=scd2_columns,
+                method=checksum_method,
+                workers=checksum_workers
+            )["scd2_checksum"].to_numpy()
+
+        with profile_stage(profiler, "fused classify", rows_in=len(df_stg.index)):
+            # Classify the active versions and the staged keys in one pass, only staged versions are compared
+            active_positions = positions[active]
+            staged_rows = np.flatnonzero(active_positions >= 0)
+            hash_dim = df_dim_active["scd2_checksum"].to_numpy()
+            hash_dim_matched = hash_dim[staged_rows]
+            hash_stg_matched = hash_stg_all[active_positions[staged_rows]]
+            upsert_rows = staged_rows[
+                (hash_dim_matched != hash_stg_matched) & pd.notnull(hash_dim_matched) & pd.notnull(hash_stg_matched)
+            ]
+
+            stg_has_active = np.zeros(len(df_stg.index), dtype=bool)
+            stg_has_active[active_positions[staged_rows]] = True
+            stg_upsert = np.zeros(len(df_stg.index), dtype=bool)
+            stg_upsert[active_positions[upsert_rows]] = True
+            stg_scd1 = np.zeros(len(df_stg.index), dtype=bool)
+            stg_scd1[positions[scd1_changed]] = True
+            stg_new = ~stg_has_active
+
+        with profile_stage(profiler, "fused close and open", rows_in=len(df_stg.index)) as stage:
+            # Close the replaced versions by position
+            closed = np.flatnonzero(active)[upsert_rows]
+
+            if len(closed):
+                # Object dtype, since effective_till may be read as strings and is set to a date
+                values["effective_till"] = np.array(values["effective_till"], dtype=None if typed_dates else object)
+                values["effective_till"][closed] = closed_date
+                values["active_flag"] = np.array(values["active_flag"])
+                values["active_flag"][closed] = 0
+
+            if persist_checksum:
+                checksums = np.full(len(df_dim.index), None, dtype=object)
+
+                if "scd2_checksum" in df_dim.columns:
+                    checksums[:] = df_dim["scd2_checksum"].to_numpy()
+
+                checksums[active] = hash_dim
+                values["scd2_checksum"] = checksums
+
+            # Open new versions for new and changed keys
+            opened = np.flatnonzero(stg_new | stg_upsert)
+            start = int(df_dim["sk"].max()) + 1 if surrogate_key == "int64" and len(df_dim.index) else 0
+            new_values = {
+                "sk": new_surrogate_keys(len(opened), surrogate_key, start=start),
+                "effective_from": np.full(len(opened), current_date, dtype=object),
+                "effective_till": np.full(len(opened), default_date, dtype=object),
+                "active_flag": np.ones(len(opened), dtype="int64"),
+                "scd2_checksum": hash_stg_all[opened]
+            }
+
+            if typed_dates:
+                new_values["effective_from"] = np.full(len(opened), current_date, dtype="int32")
+                new_values["effective_till"] = np.full(len(opened), default_date, dtype="int32")
+
+            for column in values:
+                if column in df_stg.columns and column not in new_values:
+                    new_values[column] = _values(df_stg[column]).take(opened)
+
+            stage.rows_out = len(opened)
+
+        with profile_stage(profiler, "fused assemble") as stage:
+            # Rows of the result for the dimension rows and the new versions
+            dim_keys = df_dim[key].to_numpy()
+            new_keys = df_stg[key].to_numpy()[opened]
+            flags = np.asarray(values["active_flag"])
+
+            if _is_sorted(dim_keys, flags):
+                # Merge the new versions behind the versions of their key
+                order = np.argsort(new_keys, kind="stable")
+                insert_at = np.searchsorted(dim_keys, new_keys[order], side="right")
+                new_slots = np.empty(len(opened), dtype="int64")
+                new_slots[order] = insert_at + np.arange(len(opened))
+                dim_slots = np.arange(len(dim_keys)) + np.cumsum(np.bincount(insert_at, minlength=len(dim_keys) + 1))[:-1]
+            else:
+                keys = np.concatenate([dim_keys, new_keys])
+                flags = np.concatenate([flags, np.ones(len(opened), dtype=flags.dtype)])
+
+                if keys.dtype.kind in "biuf":
+                    order = np.lexsort((flags, keys))
+                else:
+                    order = pd.DataFrame({"key": keys, "flag": flags}).sort_values(
+                        by=["key", "flag"], kind="mergesort"
+                    ).index.to_numpy()
+
+                slots = np.empty(len(keys), dtype="int64")
+                slots[order] = np.arange(len(keys))
+                dim_slots, new_slots = slots[:len(dim_keys)], slots[len(dim_keys):]
+
+            dataframe = pd.DataFrame(
+                {
+                    column: _scatter(
+                        column_values,
+                        dim_slots,
+                        new_values.get(column, np.full(len(opened), np.nan)),
+                        new_slots
+                    )
+                    for column, column_values in values.items()
+                },
+                copy=False
+            )
+            stage.rows_out = len(dataframe.index)
+
+        result = ScdResult(
+            dataframe,
+            unchanged=int((stg_has_active & ~stg_upsert & ~stg_scd1).sum()),
+            scd1=int((stg_has_active & ~stg_upsert & stg_scd1).sum()),
+            scd2=int(stg_upsert.sum()),
+            inserted=int(stg_new.sum())
+        )
+    except Exception as error:
+        if raise_errors:
+            raise
+
+        print(error)
+        result = None
+
+    return result
+
+
 def apply_scd_updates(
         dim_file: str,
         stg_file: str,
         key: str,
         scd1_columns: list[str],
-        scd2_columns: list[str]
+        scd2_columns: list[str],
+        profiler: Optional[Profiler] = None
 ) -> None:
     """
     """
     try:
         # Read CSVs files into dataframe
-        df_dim = pd.read_csv(dim_file, delimiter=",")
-        df_stg = pd.read_csv(stg_file, delimiter=",")
+        with profile_stage(profiler, "read") as stage:
+            df_dim = pd.read_csv(dim_file, delimiter=",")
+            df_stg = pd.read_csv(stg_file, delimiter=",")
+            stage.rows_out = len(df_dim.index) + len(df_stg.index)
 
-        # Perform SCD Type 1 updates
-        result = scd1(
+        # Perform SCD Type 1 and Type 2 updates in one pass
+        result = scd_fused(
             df_dim,
             df_stg,
             key=key,
-            scd1_columns=scd1_columns
-        )
-
-        # Perform SCD Type 2 updates
-        result = scd2(
-            result,
-            df_stg,
-            key=key,
-            scd2_columns=scd2_columns
+            scd1_columns=scd1_columns,
+            scd2_columns=scd2_columns,
+            profiler=profiler
         )
     except Exception as error:
         print(error)
     else:
-        print(result)
+        if result is not None:
+            print(
+                f"Unchanged {result.unchanged}, SCD1 {result.scd1}, SCD2 {result.scd2} "
+                f"and inserted {result.inserted} staged keys"
+            )
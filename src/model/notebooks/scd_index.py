@@ -0,0 +1,828 @@
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from typing import (
+    Callable,
+    NamedTuple,
+    Optional
+)
+
+import numpy as np
+import pandas as pd
+
+from ..scripts.export import (
+    as_strings,
+    write_chunks_atomic
+)
+from .scd import (
+    ScdResult,
+    calculate_checksums,
+    checksum_tag,
+    update_scd2_checksum_column
+)
+
+
+INDEX_ARRAYS = ("keys", "positions", "active", "checksums")
+
+
+def index_directory(dim_file: str) -> str:
+    """
+    Returns the directory of the index kept next to a dimension file.
+    """
+    return f"{dim_file}.scdindex"
+
+
+def file_fingerprint(filename: str) -> list[int]:
+    """
+    Returns the size and the modification time in nanoseconds of a file, which
+    change if another writer replaces or modifies it.
+    """
+    stat = os.stat(filename)
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _line_ends(data: bytes, quoted: bool = False) -> tuple[np.ndarray, bool]:
+    """
+    Returns the positions of the newlines ending a row of CSV data, newlines
+    within quoted values don't, and whether the data ends within a quoted
+    value. quoted tells whether the data starts within a quoted value.
+    """
+    values = np.frombuffer(data, dtype=np.uint8)
+
+    if not len(values):
+        return np.empty(0, dtype="int64"), quoted
+
+    # A newline is quoted after an odd number of quotes, escaped quotes count twice
+    inside = np.logical_xor.accumulate(values == ord('"'))
+
+    if quoted:
+        inside = ~inside
+
+    return np.flatnonzero((values == ord("\n")) & ~inside), bool(inside[-1])
+
+
+def csv_row_offsets(filename: str, chunk_size: int = 2 ** 26) -> np.ndarray:
+    """
+    Returns the byte offsets of the rows of a CSV file after its header. The
+    file is scanned in chunks of chunk_size bytes.
+    """
+    ends = []
+    size = 0
+    quoted = False
+
+    with open(filename, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+
+            if not chunk:
+                break
+
+            chunk_ends, quoted = _line_ends(chunk, quoted)
+            ends.append(chunk_ends + size)
+            size += len(chunk)
+
+    starts = np.concatenate(ends) + 1 if ends else np.empty(0, dtype="int64")
+
+    return starts[starts < size]
+
+
+class _IndexPart(NamedTuple):
+    """
+    Versions sorted by key with their row position in the dimension, whether
+    they are active and the SCD2 checksum of the active versions as bytes.
+    """
+    keys: np.ndarray
+    positions: np.ndarray
+    active: np.ndarray
+    checksums: np.ndarray
+
+
+class ScdChanges(NamedTuple):
+    """
+    Changes of a load planned by ScdIndex.changes. rows are the positions of
+    the updated versions in the dimension, updated their new values and
+    fields the columns changed per updated version. new holds the new
+    versions with the columns of the dimension.
+    """
+    rows: np.ndarray
+    updated: pd.DataFrame
+    fields: dict[str, np.ndarray]
+    new: pd.DataFrame
+    unchanged: int
+    scd1: int
+    scd2: int
+    inserted: int
+
+
+class ScdIndex:
+    """
+    Index of a dimension table by its natural key, kept next to the
+    dimension file so frequent loads don't join the full dimension.
+
+    The versions are held in two parts sorted by key: the main part, which is
+    memory-mapped when the index is loaded, and a small delta part with the
+    versions appended since. Closed versions are patched in place, new
+    versions are merged into the delta part, and the delta part is merged
+    into the main part once it exceeds compact_rows rows and an eighth of the
+    main part, so a load doesn't rewrite the whole index.
+
+    For CSV files the byte offsets of the rows are kept as well, so the
+    versions of the staged keys can be read without reading the dimension.
+    """
+    compact_rows = 100_000
+
+    def __init__(
+            self,
+            key: str,
+            scd2_columns: list[str],
+            main: _IndexPart,
+            delta: Optional[_IndexPart] = None,
+            method: str = "hash64",
+            rows: Optional[int] = None,
+            offsets: Optional[np.ndarray] = None,
+            delta_offsets: Optional[np.ndarray] = None,
+            fingerprint: Optional[list[int]] = None
+    ) -> None:
+        self.key = key
+        self.scd2_columns = list(scd2_columns)
+        self.method = method
+        self.main = main
+        self.delta = delta if delta is not None else _IndexPart(
+            main.keys[:0].copy(),
+            np.empty(0, dtype="int64"),
+            np.empty(0, dtype=bool),
+            np.empty(0, dtype="S1")
+        )
+        self.rows = len(main.keys) + len(self.delta.keys) if rows is None else rows
+        self.offsets = offsets
+        self.delta_offsets = delta_offsets if delta_offsets is not None or offsets is None \
+            else np.empty(0, dtype="int64")
+        self.fingerprint = fingerprint
+        # Loaded main arrays are patched in place on save unless they are replaced
+        self._directory: Optional[str] = None
+        self._closed_main: list[np.ndarray] = []
+        self._replaced_main = True
+
+    @property
+    def has_offsets(self) -> bool:
+        return self.offsets is not None
+
+    def set_offsets(self, offsets: Optional[np.ndarray]) -> None:
+        """
+        Replaces the byte offsets of the rows after the CSV file was
+        rewritten, None if they are unknown.
+        """
+        self.offsets = offsets
+        self.delta_offsets = None if offsets is None else offsets[:0]
+        self._replaced_main = True
+
+    @classmethod
+    def from_dimension(
+            cls,
+            df_dim: pd.DataFrame,
+            key: str,
+            scd2_columns: list[str],
+            method: str = "hash64",
+            workers: Optional[int] = None,
+            offsets: Optional[np.ndarray] = None
+    ) -> "ScdIndex":
+        """
+        Builds the index of a dimension table. Checksums persisted in the
+        column scd2_checksum are reused. offsets are the byte offsets of the
+        rows if the dimension was read from a CSV file, see csv_row_offsets.
+        """
+        if not scd2_columns:
+            raise ValueError("The SCD2 columns are required for a dimension index")
+
+        if offsets is not None and len(offsets) != len(df_dim.index):
+            raise ValueError(f"{len(offsets)} row offsets were given for {len(df_dim.index)} rows")
+
+        keys = cls._key_array(df_dim[key])
+        order = np.argsort(keys, kind="stable")
+        active = (df_dim["active_flag"] == 1).to_numpy()
+        checksums = np.full(len(keys), b"", dtype=object)
+        df_active = update_scd2_checksum_column(
+            df_dim[active],
+            column_name="scd2_checksum",
+            scd2_columns=scd2_columns,
+            method=method,
+            workers=workers
+        )
+        tag = checksum_tag(method, scd2_columns)
+        checksums[active] = df_active["scd2_checksum"].str.slice(len(tag)).to_numpy(dtype=str).astype("S")
+
+        return cls(
+            key,
+            scd2_columns,
+            _IndexPart(
+                keys=keys[order],
+                positions=order.astype("int64"),
+                active=active[order],
+                checksums=checksums[order].astype("S")
+            ),
+            method=method,
+            offsets=None if offsets is None else np.asarray(offsets, dtype="int64")
+        )
+
+    @classmethod
+    def load(cls, directory: str) -> "ScdIndex":
+        """
+        Reads an index written by save, the arrays of the main part are
+        memory-mapped copy-on-write.
+        """
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+
+        def load_array(name: str) -> np.ndarray:
+            filename = os.path.join(directory, f"{name}.npy")
+
+            try:
+                return np.load(filename, mmap_mode="c", allow_pickle=False)
+            except ValueError:
+                # Empty arrays can't be memory-mapped
+                return np.load(filename, allow_pickle=False)
+
+        main = _IndexPart(*[load_array(name) for name in INDEX_ARRAYS])
+
+        with np.load(os.path.join(directory, "delta.npz"), allow_pickle=False) as data:
+            delta = _IndexPart(*[data[name] for name in INDEX_ARRAYS])
+            delta_offsets = data["offsets"] if meta["offsets"] else None
+
+        index = cls(
+            meta["key"],
+            meta["scd2_columns"],
+            main,
+            delta,
+            method=meta["method"],
+            rows=meta["rows"],
+            offsets=load_array("offsets") if meta["offsets"] else None,
+            delta_offsets=delta_offsets,
+            fingerprint=meta["fingerprint"]
+        )
+        index._directory = os.path.abspath(directory)
+        index._replaced_main = False
+
+        return index
+
+    def save(self, directory: str) -> None:
+        """
+        Writes the index to directory. The arrays of a main part read from
+        directory are patched in place, the others are replaced. The meta
+        file is removed first and written last, so an interrupted save leaves
+        no readable index.
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta_file = os.path.join(directory, "meta.json")
+
+        if os.path.exists(meta_file):
+            os.remove(meta_file)
+
+        if self._replaced_main or self._directory != os.path.abspath(directory):
+            for name in INDEX_ARRAYS:
+                _save_atomic(os.path.join(directory, f"{name}.npy"), np.save, getattr(self.main, name))
+
+            if self.offsets is not None:
+                _save_atomic(os.path.join(directory, "offsets.npy"), np.save, self.offsets)
+        elif self._closed_main:
+            closed = np.concatenate(self._closed_main)
+
+            for name in ("active", "checksums"):
+                array = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r+", allow_pickle=False)
+                array[closed] = getattr(self.main, name)[closed]
+                array.flush()
+                del array
+
+        arrays = self.delta._asdict()
+
+        if self.offsets is not None:
+            arrays["offsets"] = self.delta_offsets
+
+        _save_atomic(os.path.join(directory, "delta.npz"), np.savez, **arrays)
+        _save_atomic(meta_file, lambda file, meta: file.write(json.dumps(meta).encode("utf-8")), {
+            "key": self.key,
+            "scd2_columns": self.scd2_columns,
+            "method": self.method,
+            "rows": self.rows,
+            "offsets": self.offsets is not None,
+            "fingerprint": self.fingerprint
+        })
+
+        self._directory = os.path.abspath(directory)
+        self._closed_main = []
+        self._replaced_main = False
+
+    def matches(self, dim_file: str, key: str, scd2_columns: list[str], method: str) -> bool:
+        """
+        Returns whether the index was built for the given load and dim_file
+        wasn't changed since, by its size and modification time.
+        """
+        return (self.key, self.scd2_columns, self.method) == (key, list(scd2_columns), method) \
+            and self.fingerprint == file_fingerprint(dim_file)
+
+    def changes(
+            self,
+            df_stg: pd.DataFrame,
+            read_rows: Callable[[np.ndarray], pd.DataFrame],
+            columns: list[str],
+            scd1_columns: Optional[list[str]] = None,
+            workers: Optional[int] = None,
+            current_date: Optional[datetime.date] = None
+    ) -> ScdChanges:
+        """
+        Plans the SCD Type 1 and Type 2 changes of the staging table and
+        updates the index. Only the versions of the staged keys are read by
+        read_rows, which returns the dimension rows at the given positions.
+        columns are the columns of the dimension.
+        """
+        default_date = datetime.datetime.strptime('9999-12-31', '%Y-%m-%d').date()
+        current_date = current_date or datetime.datetime.today().date()
+        stg_keys = self._key_array(df_stg[self.key])
+
+        if not pd.Index(stg_keys).is_unique:
+            raise ValueError("Merge keys are not unique in right dataset; not a many-to-one merge")
+
+        # All versions of the staged keys in both parts
+        index_parts = (self.main, self.delta)
+        found = [self._find(part, stg_keys) for part in index_parts]
+        parts = np.concatenate([np.full(len(entries), number) for number, (entries, _) in enumerate(found)])
+        entries = np.concatenate([entries for entries, _ in found])
+        stg_rows = np.concatenate([rows for _, rows in found])
+        versions = [
+            _IndexPart(*[array[part_entries] for array in part])
+            for part, (part_entries, _) in zip(index_parts, found)
+        ]
+        dim_rows = np.concatenate([version.positions for version in versions])
+        is_active = np.concatenate([version.active for version in versions])
+        dim_checksums = np.concatenate([version.checksums for version in versions])
+
+        # Compare the checksums of the active versions
+        stg_checksums = calculate_checksums(
+            df_stg.loc[:, self.scd2_columns],
+            method=self.method,
+            workers=workers
+        ).to_numpy(dtype=str).astype("S")
+        active_rows = np.flatnonzero(is_active)
+        upsert_rows = active_rows[dim_checksums[active_rows] != stg_checksums[stg_rows[active_rows]]]
+
+        stg_has_active = np.zeros(len(stg_keys), dtype=bool)
+        stg_has_active[stg_rows[active_rows]] = True
+        stg_upsert = np.zeros(len(stg_keys), dtype=bool)
+        stg_upsert[stg_rows[upsert_rows]] = True
+        stg_new = ~stg_has_active
+        opened = np.flatnonzero(stg_new | stg_upsert)
+
+        # Update SCD1 columns of all versions of a staged key
+        df_rows = read_rows(dim_rows).reset_index(drop=True)
+        fields = {}
+        updated = np.zeros(len(dim_rows), dtype=bool)
+        stg_scd1 = np.zeros(len(stg_keys), dtype=bool)
+
+        for column in scd1_columns or []:
+            dim_values = df_rows[column]
+            stg_values = df_stg[column].iloc[stg_rows].reset_index(drop=True)
+            scd1_condition = ((dim_values != stg_values) & ~(dim_values.isnull() & stg_values.isnull())).to_numpy()
+
+            if scd1_condition.any():
+                df_rows[column] = dim_values.where(~scd1_condition, stg_values)
+                fields[column] = scd1_condition
+                updated |= scd1_condition
+                stg_scd1[stg_rows[scd1_condition]] = True
+
+        # Close the replaced versions
+        closed = np.zeros(len(dim_rows), dtype=bool)
+        closed[upsert_rows] = True
+
+        if closed.any():
+            # Object dtype, since effective_till may be read as strings and is set to a date
+            if df_rows["effective_till"].dtype != object:
+                df_rows["effective_till"] = df_rows["effective_till"].astype(object)
+
+            df_rows.loc[closed, "effective_till"] = current_date - datetime.timedelta(days=1)
+            df_rows.loc[closed, "active_flag"] = 0
+            fields["effective_till"] = closed
+            fields["active_flag"] = closed
+            updated |= closed
+
+        # New versions of new and changed keys
+        df_new = df_stg.iloc[opened]
+        df_new = df_new[[column for column in df_new.columns if column in columns]].copy()
+        df_new["effective_from"] = current_date
+        df_new["effective_till"] = default_date
+        df_new["active_flag"] = 1
+
+        if "scd2_checksum" in columns:
+            df_new["scd2_checksum"] = checksum_tag(self.method, self.scd2_columns) \
+                + stg_checksums[opened].astype(str).astype(object)
+
+        df_new.insert(0, "sk", [str(uuid.uuid4()) for _ in range(len(df_new.index))])
+        df_new = df_new.reindex(columns=columns)
+
+        for number, part in enumerate(index_parts):
+            closed_entries = entries[upsert_rows[parts[upsert_rows] == number]]
+            part.active[closed_entries] = False
+            part.checksums[closed_entries] = b""
+
+            if number == 0 and len(closed_entries):
+                self._closed_main.append(closed_entries)
+
+        self._append(stg_keys[opened], stg_checksums[opened])
+
+        return ScdChanges(
+            dim_rows[updated],
+            df_rows[updated].reset_index(drop=True),
+            {column: changed[updated] for column, changed in fields.items()},
+            df_new,
+            unchanged=int((stg_has_active & ~stg_upsert & ~stg_scd1).sum()),
+            scd1=int((stg_has_active & ~stg_upsert & stg_scd1).sum()),
+            scd2=int(stg_upsert.sum()),
+            inserted=int(stg_new.sum())
+        )
+
+    def apply(
+            self,
+            df_dim: pd.DataFrame,
+            df_stg: pd.DataFrame,
+            scd1_columns: Optional[list[str]] = None,
+            workers: Optional[int] = None,
+            current_date: Optional[datetime.date] = None
+    ) -> ScdResult:
+        """
+        Applies SCD Type 1 and Type 2 changes of the staging table to the
+        dimension table like scd_fused and updates the index.
+
+        Only the versions of the staged keys are compared, the dimension is
+        copied once to append the new versions. Rows keep their position,
+        new versions are appended at the end instead of sorting the result.
+        """
+        if len(df_dim.index) != self.rows:
+            raise ValueError(f"The index holds {self.rows} rows, but the dimension {len(df_dim.index)}")
+
+        changes = self.changes(
+            df_stg,
+            lambda rows: df_dim.iloc[rows],
+            list(df_dim.columns),
+            scd1_columns=scd1_columns,
+            workers=workers,
+            current_date=current_date
+        )
+        result = pd.concat([df_dim, changes.new], axis=0, ignore_index=True)
+
+        for column, changed in changes.fields.items():
+            if column == "effective_till" and result[column].dtype != object:
+                result[column] = result[column].astype(object)
+
+            result.iloc[changes.rows[changed], result.columns.get_loc(column)] = changes.updated[column].to_numpy()[changed]
+
+        return ScdResult(
+            result,
+            unchanged=changes.unchanged,
+            scd1=changes.scd1,
+            scd2=changes.scd2,
+            inserted=changes.inserted
+        )
+
+    def apply_csv(
+            self,
+            dim_file: str,
+            df_stg: pd.DataFrame,
+            scd1_columns: Optional[list[str]] = None,
+            workers: Optional[int] = None,
+            current_date: Optional[datetime.date] = None
+    ) -> ScdResult:
+        """
+        Applies the changes like apply to the CSV file the index was built
+        from. Only the versions of the staged keys are read, updated versions
+        are patched in place and new versions are appended. If a patched
+        version changes its length, the file is rewritten atomically instead.
+
+        The dataframe of the result holds only the updated and new versions.
+        """
+        if self.offsets is None:
+            raise ValueError("The index holds no row offsets of a CSV file")
+
+        lines = {}
+
+        with open(dim_file, "rb") as file:
+            header_line = file.readline()
+            header = next(csv.reader(io.StringIO(header_line.decode("utf-8"))))
+
+            def read_rows(rows: np.ndarray) -> pd.DataFrame:
+                starts, ends = self._row_spans(rows)
+
+                for row, start, end in sorted(zip(rows.tolist(), starts.tolist(), ends.tolist()), key=lambda span: span[1]):
+                    file.seek(start)
+                    lines[row] = file.read(end - start)
+
+                data = b"".join([header_line] + [
+                    lines[row] if lines[row].endswith(b"\n") else lines[row] + b"\n" for row in rows.tolist()
+                ])
+
+                return pd.read_csv(io.BytesIO(data), delimiter=",")
+
+            changes = self.changes(df_stg, read_rows, header, scd1_columns, workers, current_date)
+
+        terminator = "\r\n" if header_line.endswith(b"\r\n") else "\n"
+        patches = self._patches(changes, header, lines)
+        appended = changes.new.to_csv(header=False, index=False, lineterminator=terminator).encode("utf-8")
+        size = self.fingerprint[0]
+
+        if all(len(patches[row]) == len(lines[row]) for row in patches):
+            with open(dim_file, "r+b") as file:
+                starts, _ = self._row_spans(np.array(list(patches), dtype="int64"))
+
+                for start, line in zip(starts.tolist(), patches.values()):
+                    file.seek(start)
+                    file.write(line)
+
+                file.seek(size)
+
+                if size and appended and self._ends_without_newline(file, size):
+                    file.write(terminator.encode("utf-8"))
+                    size += len(terminator)
+
+                file.write(appended)
+        else:
+            size = self._rewrite_csv(dim_file, patches, lines, appended, terminator)
+
+        ends, _ = _line_ends(appended)
+        new_offsets = np.concatenate([[0], ends + 1])
+        self.delta_offsets = np.concatenate([self.delta_offsets, new_offsets[new_offsets < len(appended)] + size])
+
+        return ScdResult(
+            pd.concat([changes.updated, changes.new], axis=0, ignore_index=True),
+            unchanged=changes.unchanged,
+            scd1=changes.scd1,
+            scd2=changes.scd2,
+            inserted=changes.inserted
+        )
+
+    def _patches(self, changes: ScdChanges, header: list[str], lines: dict[int, bytes]) -> dict[int, bytes]:
+        """
+        Returns the updated CSV lines by row position. Only the changed
+        fields are replaced, the others keep their text.
+        """
+        rendered = list(csv.reader(io.StringIO(changes.updated.to_csv(header=False, index=False, columns=header))))
+        patches = {}
+
+        for number, row in enumerate(changes.rows.tolist()):
+            line = lines[row]
+            ending = b"\r\n" if line.endswith(b"\r\n") else b"\n" if line.endswith(b"\n") else b""
+            fields = next(csv.reader(io.StringIO(line[:len(line) - len(ending)].decode("utf-8"))))
+
+            for column, changed in changes.fields.items():
+                if changed[number]:
+                    fields[header.index(column)] = rendered[number][header.index(column)]
+
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="").writerow(fields)
+            patches[row] = buffer.getvalue().encode("utf-8") + ending
+
+        return patches
+
+    def _rewrite_csv(
+            self,
+            dim_file: str,
+            patches: dict[int, bytes],
+            lines: dict[int, bytes],
+            appended: bytes,
+            terminator: str
+    ) -> int:
+        """
+        Copies the CSV file with the patched lines and the appended lines to
+        a temporary file, replaces the file with it and shifts the row
+        offsets. Returns the offset of the appended lines.
+        """
+        rows = np.array(sorted(patches), dtype="int64")
+        starts, _ = self._row_spans(rows)
+        handle, temp_file = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(os.path.abspath(dim_file)))
+
+        try:
+            with open(dim_file, "rb") as source, os.fdopen(handle, "wb") as target:
+                position = 0
+
+                for row, start in zip(rows.tolist(), starts.tolist()):
+                    target.write(source.read(start - position))
+                    target.write(patches[row])
+                    position = start + len(lines[row])
+                    source.seek(position)
+
+                shutil.copyfileobj(source, target)
+                size = target.tell()
+
+                if size and appended and self._ends_without_newline(source, self.fingerprint[0]):
+                    target.write(terminator.encode("utf-8"))
+                    size += len(terminator)
+
+                target.write(appended)
+
+            os.replace(temp_file, dim_file)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+        shifts = np.zeros(self.rows + 1, dtype="int64")
+        shifts[rows + 1] = [len(patches[row]) - len(lines[row]) for row in rows.tolist()]
+        shifts = np.cumsum(shifts)
+        offsets = np.concatenate([self.offsets, self.delta_offsets])
+        offsets = offsets + shifts[:len(offsets)]
+        self.offsets = offsets[:len(self.offsets)]
+        self.delta_offsets = offsets[len(self.offsets):]
+        self._replaced_main = True
+
+        return size
+
+    @staticmethod
+    def _ends_without_newline(file, size: int) -> bool:
+        file.seek(size - 1)
+        ending = file.read(1) != b"\n"
+        file.seek(size)
+
+        return ending
+
+    def _row_spans(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the byte offsets where the rows at the given positions start
+        and end in the CSV file.
+        """
+        main_rows = len(self.offsets)
+        row_count = main_rows + len(self.delta_offsets)
+        offsets = np.concatenate([self.offsets[rows[rows < main_rows]], self.delta_offsets[rows[rows >= main_rows] - main_rows]])
+        order = np.concatenate([np.flatnonzero(rows < main_rows), np.flatnonzero(rows >= main_rows)])
+        starts = np.empty(len(rows), dtype="int64")
+        starts[order] = offsets
+
+        following = rows + 1
+        ends = np.full(len(rows), self.fingerprint[0], dtype="int64")
+        in_main = following < main_rows
+        in_delta = ~in_main & (following < row_count)
+        ends[in_main] = self.offsets[following[in_main]]
+        ends[in_delta] = self.delta_offsets[following[in_delta] - main_rows]
+
+        return starts, ends
+
+    @staticmethod
+    def _find(part: _IndexPart, stg_keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the entries of all versions of the staged keys in a part of
+        the index and the staging rows they belong to.
+
+        The part isn't cast, staged keys its dtype can't hold, like longer
+        strings or fractional numbers, aren't in it.
+        """
+        keys = part.keys
+        empty = np.empty(0, dtype="int64")
+
+        if not len(keys) or not len(stg_keys):
+            return empty, empty
+
+        if (keys.dtype.kind in "SU") != (stg_keys.dtype.kind in "SU"):
+            raise ValueError(f"The staged keys ({stg_keys.dtype}) can't be compared to the indexed keys ({keys.dtype})")
+
+        common = np.promote_types(keys.dtype, stg_keys.dtype)
+        stg_common = stg_keys.astype(common)
+
+        if not (stg_common.astype(stg_keys.dtype) == stg_keys).all():
+            raise ValueError(f"The staged keys ({stg_keys.dtype}) change when compared to the indexed keys ({keys.dtype})")
+
+        with np.errstate(invalid="ignore"):
+            fits = np.flatnonzero(stg_keys.astype(keys.dtype).astype(common) == stg_common)
+
+        lookup = stg_keys[fits].astype(keys.dtype)
+        first = np.searchsorted(keys, lookup, side="left")
+        counts = np.searchsorted(keys, lookup, side="right") - first
+        entries = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        return entries, np.repeat(fits, counts)
+
+    def _append(self, keys: np.ndarray, checksums: np.ndarray) -> None:
+        """
+        Merges the new versions, which are appended to the dimension, into
+        the delta part after the versions of their key, and the delta part
+        into the main part once it is large enough.
+        """
+        delta = _IndexPart(
+            np.concatenate([self.delta.keys, keys]),
+            np.concatenate([self.delta.positions, np.arange(self.rows, self.rows + len(keys), dtype="int64")]),
+            np.concatenate([self.delta.active, np.ones(len(keys), dtype=bool)]),
+            np.concatenate([self.delta.checksums, checksums])
+        )
+        self.delta = _IndexPart(*[array[np.argsort(delta.keys, kind="stable")] for array in delta])
+        self.rows += len(keys)
+
+        if len(self.delta.keys) > max(self.compact_rows, len(self.main.keys) // 8):
+            main = _IndexPart(*[np.concatenate([main, delta]) for main, delta in zip(self.main, self.delta)])
+            self.main = _IndexPart(*[array[np.argsort(main.keys, kind="stable")] for array in main])
+            self.delta = _IndexPart(*[array[:0] for array in self.delta])
+            self._replaced_main = True
+
+            if self.offsets is not None:
+                self.offsets = np.concatenate([self.offsets, self.delta_offsets])
+                self.delta_offsets = self.delta_offsets[:0]
+
+    @staticmethod
+    def _key_array(keys: pd.Series) -> np.ndarray:
+        """
+        Returns the keys as numbers if they are numeric and as strings
+        otherwise, so they can be stored without pickling.
+        """
+        if pd.api.types.is_numeric_dtype(keys.dtype):
+            return keys.to_numpy()
+
+        return keys.astype(str).to_numpy(dtype=str)
+
+
+def _save_atomic(filename: str, save: Callable, *args, **kwargs) -> None:
+    """
+    Writes a file with save(file, ...) to a temporary file next to filename
+    and replaces filename with it.
+    """
+    handle, temp_file = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=os.path.dirname(os.path.abspath(filename)))
+
+    try:
+        with os.fdopen(handle, "wb") as file:
+            save(file, *args, **kwargs)
+
+        os.replace(temp_file, filename)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+
+def apply_scd_updates_indexed(
+        dim_file: str,
+        stg_file: str,
+        key: str,
+        scd1_columns: list[str],
+        scd2_columns: list[str],
+        checksum_method: str = "hash64",
+        checksum_workers: Optional[int] = None,
+        in_place: bool = True
+) -> Optional[ScdResult]:
+    """
+    Applies SCD Type 1 and Type 2 updates of a staging file to a dimension
+    file (CSV or Parquet).
+
+    The index of the dimension is kept next to it, see index_directory. It is
+    built on the first load or if the dimension was changed by another
+    writer, which is recognized by the size and modification time of the
+    file. Later loads compare only the staged keys.
+
+    Later loads of a CSV file also read only the versions of the staged keys,
+    patch the updated versions in place and append the new versions, so their
+    cost grows with the staging table, and the result holds only the updated
+    and new versions. If an updated version changes its length, the file is
+    rewritten atomically instead. Writing in place isn't atomic, a load which
+    must be applied completely or not at all uses in_place=False. Parquet
+    files and loads with in_place=False read the dimension and replace it
+    atomically.
+    """
+    directory = index_directory(dim_file)
+    is_parquet = dim_file.endswith(".parquet")
+
+    try:
+        if stg_file.endswith(".parquet"):
+            df_stg = pd.read_parquet(stg_file)
+        else:
+            df_stg = pd.read_csv(stg_file, delimiter=",")
+
+        index = None
+
+        if os.path.exists(os.path.join(directory, "meta.json")):
+            index = ScdIndex.load(directory)
+
+            if not index.matches(dim_file, key, scd2_columns, checksum_method):
+                print(f"The index {directory} doesn't match the dimension and is rebuilt")
+                index = None
+
+        if index is not None and index.has_offsets and in_place:
+            result = index.apply_csv(dim_file, df_stg, scd1_columns=scd1_columns, workers=checksum_workers)
+        else:
+            df_dim = pd.read_parquet(dim_file) if is_parquet else pd.read_csv(dim_file, delimiter=",")
+
+            if index is None:
+                index = ScdIndex.from_dimension(df_dim, key, scd2_columns, method=checksum_method, workers=checksum_workers)
+
+            result = index.apply(df_dim, df_stg, scd1_columns=scd1_columns, workers=checksum_workers)
+            dataframe = as_strings(result.dataframe.copy()) if is_parquet else result.dataframe
+            write_chunks_atomic([dataframe], dim_file)
+
+            if not is_parquet:
+                offsets = csv_row_offsets(dim_file)
+
+                # Without an offset per row, like with blank lines, loads read the whole file
+                index.set_offsets(offsets if len(offsets) == index.rows else None)
+
+        index.fingerprint = file_fingerprint(dim_file)
+        index.save(directory)
+    except Exception as error:
+        print(error)
+        result = None
+
+    return result
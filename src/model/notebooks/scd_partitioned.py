@@ -0,0 +1,235 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Iterator,
+    Optional
+)
+
+import numpy as np
+import pandas as pd
+
+from ..scripts.export import (
+    as_strings,
+    write_chunks
+)
+from .scd import scd_fused
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def _read_chunks(filename: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CSV or Parquet file in chunks of chunk_size rows.
+    """
+    if filename.endswith(".parquet"):
+        for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(filename, delimiter=",", chunksize=chunk_size)
+
+
+def _key_buckets(keys: pd.Series, buckets: int) -> np.ndarray:
+    """
+    Returns the bucket of every key. Numbers are hashed as floats and other
+    keys as strings, so a key lands in the same bucket in the dimension and
+    the staging table even if the types of the files differ.
+    """
+    if pd.api.types.is_numeric_dtype(keys.dtype):
+        keys = keys.astype("float64")
+    else:
+        keys = keys.astype(str)
+
+    return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % buckets).astype("int64")
+
+
+def _partition(filename: str, directory: str, key: str, buckets: int, chunk_size: int) -> "pa.Schema":
+    """
+    Splits a file by key into buckets of Parquet files below directory, one
+    file per chunk and bucket. Returns the schema of the first chunk, or of
+    the file if it has no rows.
+    """
+    schema = None
+
+    for number, chunk in enumerate(_read_chunks(filename, chunk_size)):
+        if schema is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+
+        for bucket, rows in chunk.groupby(_key_buckets(chunk[key], buckets)):
+            bucket_directory = os.path.join(directory, f"{bucket:05d}")
+            os.makedirs(bucket_directory, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pandas(rows, preserve_index=False),
+                os.path.join(bucket_directory, f"part-{number:05d}.parquet")
+            )
+
+    if schema is None:
+        if filename.endswith(".parquet"):
+            schema = pq.read_schema(filename)
+        else:
+            schema = pa.Schema.from_pandas(pd.read_csv(filename, delimiter=",", nrows=0), preserve_index=False)
+
+    return schema
+
+
+def _dimension_schema(dim_schema: "pa.Schema", stg_schema: "pa.Schema") -> "pa.Schema":
+    """
+    Returns the schema of the dimension buckets. Columns of a dimension file
+    without rows have no type and take the type of the staging table.
+    """
+    for position, field in enumerate(dim_schema):
+        if pa.types.is_null(field.type) and field.name in stg_schema.names:
+            dim_schema = dim_schema.set(position, pa.field(field.name, stg_schema.field(field.name).type))
+
+    return dim_schema
+
+
+def _result_schema(dim_schema: "pa.Schema") -> "pa.Schema":
+    """
+    Returns the schema of the results of all buckets for a Parquet target.
+    Columns keep the type of the dimension. Surrogate keys, validity dates
+    and checksums mix strings, dates and numbers and are written as strings,
+    like columns without a type.
+    """
+    names = dim_schema.names + [name for name in ["scd2_checksum"] if name not in dim_schema.names]
+    fields = []
+
+    for name in names:
+        if name in ("sk", "effective_from", "effective_till", "scd2_checksum") or pa.types.is_null(dim_schema.field(name).type):
+            fields.append(pa.field(name, pa.string()))
+        else:
+            fields.append(pa.field(name, dim_schema.field(name).type))
+
+    return pa.schema(fields)
+
+
+def _read_bucket(directory: str, schema: "pa.Schema") -> pd.DataFrame:
+    """
+    Reads all files of a bucket, an empty dataframe with the columns and
+    types of the schema if there are none.
+    """
+    if not os.path.isdir(directory):
+        return schema.empty_table().to_pandas()
+
+    parts = [
+        pq.read_table(os.path.join(directory, filename)).to_pandas()
+        for filename in sorted(os.listdir(directory))
+    ]
+
+    return pd.concat(parts, axis=0, ignore_index=True)
+
+
+def _apply_bucket(
+        dim_directory: str,
+        stg_directory: str,
+        target_file: str,
+        dim_schema: "pa.Schema",
+        stg_schema: "pa.Schema",
+        key: str,
+        scd1_columns: list[str],
+        scd2_columns: list[str],
+        checksum_method: str
+) -> int:
+    """
+    Applies the SCD updates of a staging bucket to a dimension bucket and
+    writes the result to target_file. Returns the number of rows.
+    """
+    df_dim = _read_bucket(dim_directory, dim_schema)
+    df_stg = _read_bucket(stg_directory, stg_schema)
+
+    # Perform SCD Type 1 and Type 2 updates in one pass
+    result = scd_fused(
+        df_dim,
+        df_stg,
+        key=key,
+        scd1_columns=scd1_columns,
+        scd2_columns=scd2_columns,
+        checksum_method=checksum_method
+    )
+
+    if result is None:
+        raise RuntimeError(f"Failed to apply the SCD updates to the bucket {os.path.basename(dim_directory)}")
+
+    # Pickled, since the date columns of the result mix strings and dates
+    result.dataframe.to_pickle(target_file)
+
+    return len(result.dataframe.index)
+
+
+def apply_scd_updates_partitioned(
+        dim_file: str,
+        stg_file: str,
+        target_file: str,
+        key: str,
+        scd1_columns: list[str],
+        scd2_columns: list[str],
+        buckets: int = 16,
+        processes: Optional[int] = None,
+        chunk_size: int = 1_000_000,
+        work_directory: Optional[str] = None,
+        checksum_method: str = "hash64"
+) -> int:
+    """
+    Applies SCD Type 1 and Type 2 updates like apply_scd_updates to
+    dimensions larger than the memory and writes the result to target_file
+    (CSV or Parquet). Returns the number of rows written.
+
+    Dimension and staging rows are read in chunks of chunk_size rows and
+    hash partitioned by key into buckets of Parquet files in a temporary
+    directory below work_directory (by default next to target_file). The
+    buckets are updated in a process pool and streamed to target_file in
+    bucket order, rows are sorted by key and active_flag within a bucket.
+    A Parquet target is written with the column types of the dimension,
+    object columns as strings, see _result_schema.
+    Memory is bounded by the chunk size and by the size of a bucket per
+    process, so buckets should be chosen to fit into memory.
+    """
+    if pq is None:
+        raise ImportError("The pyarrow package is required for partitioned SCD updates")
+
+    work_directory = work_directory or os.path.dirname(os.path.abspath(target_file))
+    directory = tempfile.mkdtemp(prefix="scd-", dir=work_directory)
+
+    try:
+        stg_schema = _partition(stg_file, os.path.join(directory, "stg"), key, buckets, chunk_size)
+        dim_schema = _dimension_schema(
+            _partition(dim_file, os.path.join(directory, "dim"), key, buckets, chunk_size),
+            stg_schema
+        )
+        result_files = [os.path.join(directory, f"result-{bucket:05d}.pickle") for bucket in range(buckets)]
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(
+                    _apply_bucket,
+                    os.path.join(directory, "dim", f"{bucket:05d}"),
+                    os.path.join(directory, "stg", f"{bucket:05d}"),
+                    result_files[bucket],
+                    dim_schema,
+                    stg_schema,
+                    key,
+                    scd1_columns,
+                    scd2_columns,
+                    checksum_method
+                )
+                for bucket in range(buckets)
+            ]
+
+            # Stream the buckets in order as soon as they are finished
+            def results() -> Iterator[pd.DataFrame]:
+                for future, result_file in zip(futures, result_files):
+                    if future.result():
+                        result = pd.read_pickle(result_file)
+                        yield as_strings(result) if target_file.endswith(".parquet") else result
+
+                    os.remove(result_file)
+
+            return write_chunks(results(), target_file, schema=_result_schema(dim_schema))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
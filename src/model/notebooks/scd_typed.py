@@ -0,0 +1,190 @@
+import uuid
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..scripts.export import write_chunks_atomic
+from .scd import (
+    ScdResult,
+    scd_fused,
+    to_days
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+DATE_COLUMNS = ("effective_from", "effective_till")
+
+UUID16_DTYPE = pd.ArrowDtype(pa.binary(16)) if pa is not None else None
+
+
+def to_typed_dimension(df_dim: pd.DataFrame, surrogate_key: str = "int64") -> pd.DataFrame:
+    """
+    Converts a dimension with date objects or strings, like one read from a
+    CSV file, to the layout of scd_fused with typed_dates=True. Surrogate
+    keys are converted by to_uuid16 for surrogate_key "uuid16", "int64"
+    requires numeric surrogate keys. Typed dimensions are returned unchanged.
+    """
+    result = df_dim.copy()
+
+    for column in DATE_COLUMNS:
+        result[column] = to_days(result[column])
+
+    if surrogate_key == "uuid16":
+        result["sk"] = to_uuid16(result["sk"])
+    elif surrogate_key == "int64":
+        result["sk"] = result["sk"].astype("int64")
+
+    return result
+
+
+def to_uuid16(values: pd.Series) -> pd.api.extensions.ExtensionArray:
+    """
+    Converts UUID strings or 16 bytes to an Arrow fixed_size_binary(16)
+    array, the layout of uuid16 surrogate keys. Strings are converted in bulk
+    from their hex digits.
+    """
+    if pa is None:
+        raise ImportError("The pyarrow package is required for uuid16 surrogate keys")
+
+    if values.dtype == UUID16_DTYPE:
+        return values.array
+
+    kind = pd.api.types.infer_dtype(values, skipna=False)
+
+    if kind == "string":
+        try:
+            data = bytes.fromhex("".join(values.str.replace("-", "", regex=False)))
+        except ValueError:
+            data = b""
+
+        if len(data) != 16 * len(values.index):
+            raise ValueError("The surrogate keys are not all UUIDs")
+
+        array = pa.FixedSizeBinaryArray.from_buffers(pa.binary(16), len(values.index), [None, pa.py_buffer(data)])
+    elif kind in ("bytes", "empty"):
+        array = pa.array(values.to_numpy(dtype=object), type=pa.binary(16))
+    else:
+        array = pa.array(
+            [value if isinstance(value, bytes) else uuid.UUID(value).bytes for value in values],
+            type=pa.binary(16)
+        )
+
+    return pd.arrays.ArrowExtensionArray(array)
+
+
+def typed_schema(dataframe: pd.DataFrame) -> "pa.Schema":
+    """
+    Returns the Parquet schema of a typed dimension, with the date columns
+    as date32 and 16 byte surrogate keys as fixed_size_binary(16).
+    """
+    if pa is None:
+        raise ImportError("The pyarrow package is required for typed dimensions")
+
+    schema = pa.Schema.from_pandas(dataframe, preserve_index=False)
+
+    for position, field in enumerate(schema):
+        if field.name in DATE_COLUMNS:
+            schema = schema.set(position, pa.field(field.name, pa.date32()))
+        elif field.name == "sk" and pa.types.is_binary(field.type):
+            schema = schema.set(position, pa.field(field.name, pa.binary(16)))
+
+    return schema
+
+
+def read_typed_dimension(filename: str) -> pd.DataFrame:
+    """
+    Reads a typed dimension from a Parquet file, date32 columns are read as
+    days since 1970-01-01 instead of date objects and fixed_size_binary(16)
+    columns as Arrow arrays instead of bytes objects.
+    """
+    if pq is None:
+        raise ImportError(f"The pyarrow package is required to read {filename}")
+
+    table = pq.read_table(filename)
+
+    for position, field in enumerate(table.schema):
+        if pa.types.is_date32(field.type):
+            table = table.set_column(position, field.name, table.column(position).cast(pa.int32()))
+
+    return table.to_pandas(types_mapper={pa.binary(16): UUID16_DTYPE}.get)
+
+
+def write_typed_dimension(dataframe: pd.DataFrame, filename: str) -> int:
+    """
+    Writes a typed dimension atomically to a Parquet file. Returns the
+    number of rows written.
+    """
+    if not filename.endswith(".parquet"):
+        raise ValueError(f"Typed dimensions are written to Parquet files, not to {filename}")
+
+    schema = typed_schema(dataframe)
+    dataframe = dataframe.copy(deep=False)
+
+    # The pandas metadata of Arrow dtypes with parameters can't be read again, the buffer is written as S16
+    for column in dataframe.columns[dataframe.dtypes == UUID16_DTYPE]:
+        array = pa.array(dataframe[column].array)
+
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+
+        dataframe[column] = np.frombuffer(array.buffers()[1], dtype="S16", count=len(array), offset=16 * array.offset)
+
+    return write_chunks_atomic([dataframe], filename, schema=schema)
+
+
+def apply_scd_updates_typed(
+        dim_file: str,
+        stg_file: str,
+        target_file: str,
+        key: str,
+        scd1_columns: list[str],
+        scd2_columns: list[str],
+        surrogate_key: str = "int64",
+        checksum_method: str = "hash64",
+        checksum_workers: Optional[int] = None
+) -> Optional[ScdResult]:
+    """
+    Applies SCD Type 1 and Type 2 updates like apply_scd_updates on typed
+    columns and writes the result to the Parquet file target_file.
+
+    Surrogate keys are int64 sequences or 16 byte UUIDs and validity dates
+    are days since 1970-01-01, written as date32. A dimension from a CSV file
+    or with date objects is converted with to_typed_dimension first.
+    """
+    try:
+        if dim_file.endswith(".parquet"):
+            df_dim = read_typed_dimension(dim_file)
+        else:
+            df_dim = pd.read_csv(dim_file, delimiter=",")
+
+        if stg_file.endswith(".parquet"):
+            df_stg = pd.read_parquet(stg_file)
+        else:
+            df_stg = pd.read_csv(stg_file, delimiter=",")
+
+        result = scd_fused(
+            to_typed_dimension(df_dim, surrogate_key),
+            df_stg,
+            key=key,
+            scd1_columns=scd1_columns,
+            scd2_columns=scd2_columns,
+            checksum_method=checksum_method,
+            checksum_workers=checksum_workers,
+            surrogate_key=surrogate_key,
+            typed_dates=True
+        )
+
+        if result is not None:
+            write_typed_dimension(result.dataframe, target_file)
+    except Exception as error:
+        print(error)
+        result = None
+
+    return result
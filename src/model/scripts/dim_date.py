@@ -1,146 +1,823 @@
 import argparse
 import datetime
+import functools
 import holidays
-import locale
+import itertools
+import numpy as np
+import os
 import pandas as pd
+import sys
+import tempfile
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional
+)
+
+# Run as a file instead of python -m src.model.scripts.dim_date: resolve the package imports
+# from the root of the repository
+if __name__ == "__main__" and not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+    __package__ = "src.model.scripts"
+
+from ...profiling import (
+    Profiler,
+    profile_stage
+)
+from .export import write_chunks
+
+
+HOLIDAY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "data-utils", "holidays")
+DEFAULT_HOLIDAY_REGIONS = (("DE", "BW"),)
+DEFAULT_LANGUAGES = ("de",)
+
+# Month names start with January, day names with Monday
+DATE_NAMES = {
+    "de": {
+        "month_short": ["Jan", "Feb", "Mär", "Apr", "Mai", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dez"],
+        "month_long": [
+            "Januar", "Februar", "März", "April", "Mai", "Juni",
+            "Juli", "August", "September", "Oktober", "November", "Dezember"
+        ],
+        "day_short": ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"],
+        "day_long": ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+    },
+    "en": {
+        "month_short": ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        "month_long": [
+            "January", "February", "March", "April", "May", "June",
+            "July", "August", "September", "October", "November", "December"
+        ],
+        "day_short": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+        "day_long": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    },
+    "fr": {
+        "month_short": [
+            "janv.", "févr.", "mars", "avril", "mai", "juin",
+            "juil.", "août", "sept.", "oct.", "nov.", "déc."
+        ],
+        "month_long": [
+            "janvier", "février", "mars", "avril", "mai", "juin",
+            "juillet", "août", "septembre", "octobre", "novembre", "décembre"
+        ],
+        "day_short": ["lun.", "mar.", "mer.", "jeu.", "ven.", "sam.", "dim."],
+        "day_long": ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+    },
+    "es": {
+        "month_short": ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"],
+        "month_long": [
+            "enero", "febrero", "marzo", "abril", "mayo", "junio",
+            "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+        ],
+        "day_short": ["lun", "mar", "mié", "jue", "vie", "sáb", "dom"],
+        "day_long": ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+    },
+    "it": {
+        "month_short": ["gen", "feb", "mar", "apr", "mag", "giu", "lug", "ago", "set", "ott", "nov", "dic"],
+        "month_long": [
+            "gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno",
+            "luglio", "agosto", "settembre", "ottobre", "novembre", "dicembre"
+        ],
+        "day_short": ["lun", "mar", "mer", "gio", "ven", "sab", "dom"],
+        "day_long": ["lunedì", "martedì", "mercoledì", "giovedì", "venerdì", "sabato", "domenica"]
+    }
+}
+
+RETAIL_PATTERNS = {
+    "4-4-5": (4, 4, 5),
+    "4-5-4": (4, 5, 4),
+    "5-4-4": (5, 4, 4)
+}
+
+
+class RetailCalendar(NamedTuple):
+    """
+    Retail calendar of 52 or 53 weeks with periods of 4 and 5 weeks. The year
+    ends on the weekday (0 is Monday) which is the last one of end_month or,
+    with nearest=True, the one nearest to the end of end_month. A year is
+    named by the calendar year in which it ends, week 53 belongs to the last
+    period.
+    """
+    pattern: str = "4-4-5"
+    end_month: int = 12
+    end_weekday: int = 5
+    nearest: bool = True
+
+
+# Columns added once per further language, with the language as suffix
+LANGUAGE_COLUMNS = ("Monat_Name_Kurz", "Monat_Name_Lang", "Monat_Name_Lang_Jahr", "Tag_Name_Kurz", "Tag_Name_Lang")
+
+
+class HolidayIndex(NamedTuple):
+    """
+    Holidays of a region as sorted days since 1970-01-01 and their names.
+    """
+    days: np.ndarray
+    names: np.ndarray
+
+    @classmethod
+    def from_holidays(cls, calendar: holidays.HolidayBase) -> "HolidayIndex":
+        days = np.array(list(calendar.keys()), dtype="datetime64[D]").astype("int64")
+        names = np.array(list(calendar.values()), dtype=str)
+        order = np.argsort(days, kind="stable")
+        return cls(days[order], names[order])
+
+    def match(self, days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns for every day whether it is a holiday and the position of the
+        holiday in the index.
+        """
+        positions = np.searchsorted(self.days, days).clip(0, max(len(self.days) - 1, 0))
+        found = self.days[positions] == days if len(self.days) else np.zeros(len(days), dtype=bool)
+        return found, positions
+
+
+def holiday_suffix(region: tuple[str, Optional[str]]) -> str:
+    """
+    Returns the suffix of the holiday columns of a region, the subdivision
+    if there is one and the country otherwise.
+    """
+    country, subdiv = region
+    return subdiv or country
+
+
+def holiday_suffixes(regions: Iterable[tuple[str, Optional[str]]]) -> dict[str, tuple[str, Optional[str]]]:
+    """
+    Returns the regions by the suffix of their holiday columns. Regions which
+    would share a suffix, like DE-BE and BE, are rejected, since their
+    holidays would end up in the same columns.
+    """
+    suffixes = {}
+
+    for region in dict.fromkeys(regions):
+        suffix = holiday_suffix(region)
+
+        if suffix in suffixes:
+            raise ValueError(
+                f"The holiday regions {'-'.join(filter(None, suffixes[suffix]))} and "
+                f"{'-'.join(filter(None, region))} share the column suffix {suffix}"
+            )
+
+        suffixes[suffix] = region
+
+    return suffixes
+
+
+def parse_holiday_regions(regions: str) -> list[tuple[str, Optional[str]]]:
+    """
+    Parses a comma separated list of regions like "DE-BW,DE-BY,AT".
+    """
+    parsed = []
+
+    for region in regions.split(","):
+        country, _, subdiv = region.strip().partition("-")
+        parsed.append((country.upper(), subdiv.upper() or None))
+
+    return parsed
+
+
+@functools.lru_cache(maxsize=None)
+def load_holiday_index(
+        country: str,
+        subdiv: Optional[str],
+        first_year: int,
+        last_year: int,
+        cache_dir: Optional[str] = HOLIDAY_CACHE_DIR
+) -> HolidayIndex:
+    """
+    Returns the holiday index of a region for the years first_year to
+    last_year. Indexes are kept on disk in cache_dir per version of the
+    holidays package, no cache is used if cache_dir is None.
+    """
+    cache_file = None
+
+    if cache_dir is not None:
+        cache_file = os.path.join(
+            cache_dir,
+            f"{country}_{subdiv or ''}_{first_year}_{last_year}_{holidays.__version__}.npz"
+        )
+
+        try:
+            with np.load(cache_file, allow_pickle=False) as data:
+                return HolidayIndex(data["days"], data["names"])
+        except (OSError, KeyError, ValueError):
+            pass
+
+    calendar = holidays.country_holidays(country, subdiv=subdiv, years=range(first_year, last_year + 1))
+    index = HolidayIndex.from_holidays(calendar)
+
+    if cache_file is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            handle, temp_file = tempfile.mkstemp(suffix=".npz", dir=cache_dir)
+
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, days=index.days, names=index.names)
+
+            os.replace(temp_file, cache_file)
+        except OSError as error:
+            print(f"Unable to cache the holidays in {cache_dir}. Error details: {error!r}")
+
+    return index
+
+
+def language_column(name: str, language: Optional[str]) -> str:
+    """
+    Returns the name of a column in a further language, like Tag_Name_Lang_EN.
+    """
+    return f"{name}_{language.upper()}" if language else name
+
+
+class _ColumnBuilder(NamedTuple):
+    name: str
+    func: Callable[["DimDate"], tuple[str, pd.Series]]
+    depends: tuple[str, ...]
+    default: bool = True
+
+
+_DATE_COLUMNS: dict[str, _ColumnBuilder] = {}
+
+
+def date_column(name: str, depends: Iterable[str] = (), default: bool = True) -> Callable:
+    """
+    Registers a column builder for the date dimension. The builder is called
+    with the DimDate instance and returns the column name and series. Columns
+    listed in depends are built before and can be read with DimDate.column.
+    Columns with default=False are only built if they are requested.
+    """
+    def decorator(func: Callable[["DimDate"], tuple[str, pd.Series]]) -> Callable:
+        _DATE_COLUMNS[name] = _ColumnBuilder(name, func, tuple(depends), default)
+        return func
+
+    return decorator
 
 
 class DimDate:
-    def __init__(self, start: datetime.date, end: datetime.date) -> None:
-        self.__ger_holiday = holidays.Germany(subdiv="BW", years=range(start.year, end.year))
-        self.__date_series = pd.Series(pd.date_range(start, end))
-        self.__dataframe = pd.DataFrame(self.__create_columns())
+    KEY_COLUMN = "Datum_Key"
+
+    def __init__(
+            self,
+            start: datetime.date,
+            end: datetime.date,
+            columns: Optional[Iterable[str]] = None,
+            holiday_regions: Iterable[tuple[str, Optional[str]]] = DEFAULT_HOLIDAY_REGIONS,
+            holiday_cache_dir: Optional[str] = HOLIDAY_CACHE_DIR,
+            holiday_years: Optional[tuple[int, int]] = None,
+            languages: Iterable[str] = DEFAULT_LANGUAGES,
+            fiscal_year_start: int = 1,
+            retail_calendar: RetailCalendar = RetailCalendar(),
+            profiler: Optional[Profiler] = None
+    ) -> None:
+        """
+        Prepares a date dimension from start to end. Only the given columns
+        (all columns by default) are part of the dataframe, the key column is
+        always included. Columns are built on first access.
+
+        A Feiertag and a Feiertag_Name column is added for every region of
+        holiday_regions, given as pairs of country and subdivision (or None)
+        and named by holiday_suffix, so regions must not share a suffix.
+        The holidays are indexed for the first to the last year of
+        holiday_years, by default for the years of the dimension.
+
+        Month and day names are taken from DATE_NAMES in the first of the
+        languages. Every further language adds the name columns again with
+        the language as suffix, like Monat_Name_Lang_EN.
+
+        The fiscal columns (Geschaeftsjahr...) start the year with the month
+        fiscal_year_start and name it by the calendar year in which it ends.
+        The retail columns (Retail_...) follow retail_calendar. Both are only
+        built if they are requested in columns.
+
+        With a profiler the building of every column is measured as a stage.
+        """
+        if not 1 <= fiscal_year_start <= 12:
+            raise ValueError(f"The fiscal year must start with a month from 1 to 12, not {fiscal_year_start}")
+
+        if retail_calendar.pattern not in RETAIL_PATTERNS:
+            raise ValueError(
+                f"Unknown retail pattern {retail_calendar.pattern!r}, expected one of: {', '.join(RETAIL_PATTERNS)}"
+            )
+
+        languages = list(dict.fromkeys(languages))
+        unknown_languages = [language for language in languages if language not in DATE_NAMES]
+
+        if not languages or unknown_languages:
+            raise ValueError(
+                f"Unknown languages for the date dimension: {', '.join(unknown_languages) or 'none given'}, "
+                f"expected some of: {', '.join(DATE_NAMES)}"
+            )
+
+        self.__builders = dict(_DATE_COLUMNS)
+        self.__holiday_regions = holiday_suffixes(holiday_regions)
+
+        for suffix in self.__holiday_regions:
+            self.__builders[f"Feiertag_{suffix}"] = _ColumnBuilder(
+                f"Feiertag_{suffix}", functools.partial(DimDate.__column_is_holiday, suffix=suffix), ()
+            )
+            self.__builders[f"Feiertag_Name_{suffix}"] = _ColumnBuilder(
+                f"Feiertag_Name_{suffix}", functools.partial(DimDate.__column_holiday_name, suffix=suffix), ()
+            )
+
+        for language in languages[1:]:
+            for name in LANGUAGE_COLUMNS:
+                builder = _DATE_COLUMNS[name]
+                self.__builders[language_column(name, language)] = _ColumnBuilder(
+                    language_column(name, language),
+                    functools.partial(builder.func, language=language),
+                    tuple(
+                        language_column(dependency, language) if dependency in LANGUAGE_COLUMNS else dependency
+                        for dependency in builder.depends
+                    )
+                )
+
+        columns = list(columns) if columns is not None else [
+            name for name, builder in self.__builders.items() if builder.default
+        ]
+        unknown_columns = [column for column in columns if column not in self.__builders]
 
-        keys = self.column_date_key()
-        self.__dataframe.insert(0, keys[0], keys[1])
+        if unknown_columns:
+            raise ValueError(f"Unknown columns for the date dimension: {', '.join(unknown_columns)}")
+
+        self.__languages = languages
+        self.__fiscal_year_start = fiscal_year_start
+        self.__retail_calendar = retail_calendar
+        self.__retail_columns: Optional[dict[str, np.ndarray]] = None
+        self.__holiday_cache_dir = holiday_cache_dir
+        self.__holiday_matches: dict[str, tuple[HolidayIndex, np.ndarray, np.ndarray]] = {}
+        self.__date_series = pd.Series(pd.date_range(start, end))
+        self.__holiday_years = holiday_years or (start.year, end.year)
+        self.__columns = [self.KEY_COLUMN] + [column for column in columns if column != self.KEY_COLUMN]
+        self.__cache: dict[str, pd.Series] = {}
+        self.__building: set[str] = set()
+        self.__dataframe = None
+        self.__profiler = profiler
 
     @property
     def dataframe(self) -> pd.DataFrame:
-        return self.__dataframe
+        if self.__dataframe is None:
+            columns = {column: self.column(column) for column in self.__columns}
 
-    def __create_columns(self) -> dict[str, pd.Series]:
-        column_data = {"Datum": self.__date_series}
-        handlers = [
-            self.column_year(),
-            self.column_quarter(),
-            self.column_quarter_name(),
-            self.column_quarter_name_year(),
-            self.column_month(),
-            self.column_month_text(),
-            self.column_month_name_short(),
-            self.column_month_name_long(),
-            self.column_month_name_long_year(),
-            self.column_week_year(),
-            self.column_week_year_text(),
-            self.column_day_month(),
-            self.column_day_month_text(),
-            self.column_day_name_short(),
-            self.column_day_name_long(),
-            self.column_is_holiday_bw(),
-            self.column_holiday_name_bw()
-        ]
+            with profile_stage(self.__profiler, "date dataframe", rows_in=len(self.__date_series.index)):
+                self.__dataframe = pd.DataFrame(columns)
 
-        column_data.update({column: series for column, series in handlers})
+        return self.__dataframe
 
-        return column_data
+    @property
+    def columns(self) -> list[str]:
+        return list(self.__columns)
+
+    @property
+    def date_series(self) -> pd.Series:
+        return self.__date_series
+
+    @staticmethod
+    def available_columns(
+            holiday_regions: Iterable[tuple[str, Optional[str]]] = DEFAULT_HOLIDAY_REGIONS,
+            languages: Iterable[str] = DEFAULT_LANGUAGES,
+            optional: bool = True
+    ) -> list[str]:
+        columns = [name for name, builder in _DATE_COLUMNS.items() if optional or builder.default]
+
+        for suffix in holiday_suffixes(holiday_regions):
+            columns += [f"Feiertag_{suffix}", f"Feiertag_Name_{suffix}"]
+
+        for language in list(dict.fromkeys(languages))[1:]:
+            columns += [language_column(name, language) for name in LANGUAGE_COLUMNS]
+
+        return columns
+
+    def iter_chunks(self, years: int = 10) -> Iterator[pd.DataFrame]:
+        """
+        Yields the dataframe in chunks of the given number of calendar years.
+        Every chunk is built on its own, so only one chunk is held in memory.
+        """
+        dates = self.__date_series
+        year_values = dates.dt.year.to_numpy()
+
+        if not len(year_values):
+            return
+
+        # Rows at which a chunk of years starts, the last boundary is the end of the dimension
+        chunk_years = np.arange(year_values[0] + years, year_values[-1] + 1, years)
+        boundaries = list(np.searchsorted(year_values, chunk_years)) + [len(year_values)]
+        first_row = 0
+
+        for last_row in boundaries:
+            chunk = DimDate(
+                start=dates.iloc[first_row],
+                end=dates.iloc[last_row - 1],
+                columns=self.__columns,
+                holiday_regions=self.__holiday_regions.values(),
+                holiday_cache_dir=self.__holiday_cache_dir,
+                holiday_years=self.__holiday_years,
+                languages=self.__languages,
+                fiscal_year_start=self.__fiscal_year_start,
+                retail_calendar=self.__retail_calendar,
+                profiler=self.__profiler
+            ).dataframe
+            chunk.index = pd.RangeIndex(first_row, last_row)
+            yield chunk
+            first_row = last_row
+
+    def column(self, name: str) -> pd.Series:
+        """
+        Returns a column of the dimension, building it and its dependencies
+        on first access.
+        """
+        if name in self.__cache:
+            return self.__cache[name]
+
+        if name not in self.__builders:
+            raise ValueError(f"Unknown column for the date dimension: {name}")
+
+        if name in self.__building:
+            raise ValueError(f"Circular dependency between date dimension columns: {name}")
+
+        builder = self.__builders[name]
+        self.__building.add(name)
+
+        try:
+            for dependency in builder.depends:
+                self.column(dependency)
+
+            with profile_stage(self.__profiler, f"date column {name}") as stage:
+                self.__cache[name] = builder.func(self)[1]
+                stage.rows_out = len(self.__cache[name].index)
+        finally:
+            self.__building.discard(name)
+
+        return self.__cache[name]
+
+    def __holidays(self, suffix: str) -> tuple[HolidayIndex, np.ndarray, np.ndarray]:
+        """
+        Joins the dates with the holiday index of a region.
+        """
+        if suffix not in self.__holiday_matches:
+            country, subdiv = self.__holiday_regions[suffix]
+            first_year, last_year = self.__holiday_years
+            index = load_holiday_index(country, subdiv, first_year, last_year, self.__holiday_cache_dir)
+            self.__holiday_matches[suffix] = index, *index.match(self.__days())
+
+        return self.__holiday_matches[suffix]
+
+    def __days(self) -> np.ndarray:
+        """
+        Returns the dates as days since 1970-01-01.
+        """
+        return self.__date_series.to_numpy().astype("datetime64[D]").astype("int64")
+
+    def __retail(self) -> dict[str, np.ndarray]:
+        """
+        Computes year, week and period of the retail calendar. The year ends
+        of all years around the dimension are computed once and the dates are
+        joined to them with searchsorted.
+        """
+        if self.__retail_columns is None:
+            calendar = self.__retail_calendar
+            days = self.__days()
+            first_year = self.__date_series.dt.year.min() if len(days) else 1970
+            last_year = self.__date_series.dt.year.max() if len(days) else 1970
+
+            # A year can end a few days after its month, so the years around the range are included
+            years = np.arange(first_year - 2, last_year + 3)
+            month_ends = (
+                (years - 1970).astype("datetime64[Y]").astype("datetime64[M]") + calendar.end_month
+            ).astype("datetime64[D]").astype("int64") - 1
+            offsets = ((month_ends + 3) % 7 - calendar.end_weekday) % 7
+            year_ends = month_ends - offsets
+
+            if calendar.nearest:
+                year_ends = np.where(offsets > 3, year_ends + 7, year_ends)
+
+            positions = np.searchsorted(year_ends, days)
+            day_of_year = days - year_ends[positions - 1] - 1
+            weeks = day_of_year // 7 + 1
+            periods = np.repeat(np.arange(1, 13), RETAIL_PATTERNS[calendar.pattern] * 4)
+            periods = np.append(periods, 12)[weeks - 1]
+            self.__retail_columns = {
+                "Retail_Jahr": years[positions],
+                "Retail_Quartal": (periods - 1) // 3 + 1,
+                "Retail_Periode": periods,
+                "Retail_Woche": weeks,
+                "Retail_Wochen_Jahr": (year_ends[positions] - year_ends[positions - 1]) // 7
+            }
+
+        return self.__retail_columns
 
     def column_template(self) -> tuple[str, pd.Series]:
         column = ""
         series = self.__date_series
         return column, series
 
+    @date_column("Datum_Key")
     def column_date_key(self) -> tuple[str, pd.Series]:
         column = "Datum_Key"
-        series = self.__date_series.apply(lambda x: 10000 * x.year + 100 * x.month + x.day)
+        dates = self.__date_series.dt
+        series = (10000 * dates.year + 100 * dates.month + dates.day).astype("int64")
         return column, series
 
+    @date_column("Datum")
+    def column_date(self) -> tuple[str, pd.Series]:
+        column = "Datum"
+        series = self.__date_series
+        return column, series
+
+    @date_column("Jahr")
     def column_year(self) -> tuple[str, pd.Series]:
         column = "Jahr"
         series = self.__date_series.dt.year
         return column, series
 
+    @date_column("Quartal")
     def column_quarter(self) -> tuple[str, pd.Series]:
         column = "Quartal"
         series = self.__date_series.dt.quarter
         return column, series
 
+    @date_column("Quartal_Name", depends=("Quartal",))
     def column_quarter_name(self) -> tuple[str, pd.Series]:
         column = "Quartal_Name"
-        series = self.__date_series.apply(lambda x: f"Q{x.quarter}")
+        names = [f"Q{quarter}" for quarter in range(1, 5)]
+        series = self.__lookup(names, self.column("Quartal") - 1)
         return column, series
 
+    @date_column("Quartal_Name_Jahr", depends=("Jahr", "Quartal"))
     def column_quarter_name_year(self) -> tuple[str, pd.Series]:
         column = "Quartal_Name_Jahr"
-        series = self.__date_series.apply(lambda x: f"Q{x.quarter} {x.strftime('%Y')}")
+        years = self.column("Jahr")
+        first_year = years.min()
+        names = [
+            f"Q{quarter} {year}"
+            for year in range(first_year, years.max() + 1)
+            for quarter in range(1, 5)
+        ]
+        series = self.__lookup(names, 4 * (years - first_year) + self.column("Quartal") - 1)
         return column, series
 
+    @date_column("Monat")
     def column_month(self) -> tuple[str, pd.Series]:
         column = "Monat"
         series = self.__date_series.dt.month
         return column, series
 
+    @date_column("Monat_Text", depends=("Monat",))
     def column_month_text(self) -> tuple[str, pd.Series]:
         column = "Monat_Text"
-        series = self.__date_series.apply(lambda x: f"{x.month:02d}")
+        names = [f"{month:02d}" for month in range(1, 13)]
+        series = self.__lookup(names, self.column("Monat") - 1)
         return column, series
 
-    def column_month_name_short(self) -> tuple[str, pd.Series]:
-        column = "Monat_Name_Kurz"
-        series = self.__date_series.dt.strftime("%b")
+    @date_column("Monat_Name_Kurz", depends=("Monat",))
+    def column_month_name_short(self, language: Optional[str] = None) -> tuple[str, pd.Series]:
+        column = language_column("Monat_Name_Kurz", language)
+        series = self.__lookup(self.__names("month_short", language), self.column("Monat") - 1)
         return column, series
 
-    def column_month_name_long(self) -> tuple[str, pd.Series]:
-        column = "Monat_Name_Lang"
-        series = self.__date_series.dt.strftime("%B")
+    @date_column("Monat_Name_Lang", depends=("Monat",))
+    def column_month_name_long(self, language: Optional[str] = None) -> tuple[str, pd.Series]:
+        column = language_column("Monat_Name_Lang", language)
+        series = self.__lookup(self.__names("month_long", language), self.column("Monat") - 1)
         return column, series
 
-    def column_month_name_long_year(self) -> tuple[str, pd.Series]:
-        column = "Monat_Name_Lang_Jahr"
-        series = self.__date_series.dt.strftime("%B %Y")
+    @date_column("Monat_Name_Lang_Jahr", depends=("Monat_Name_Lang", "Jahr"))
+    def column_month_name_long_year(self, language: Optional[str] = None) -> tuple[str, pd.Series]:
+        column = language_column("Monat_Name_Lang_Jahr", language)
+        series = self.column(language_column("Monat_Name_Lang", language)) + " " + self.column("Jahr").astype(str)
         return column, series
 
+    @date_column("Woche_Jahr")
     def column_week_year(self) -> tuple[str, pd.Series]:
         column = "Woche_Jahr"
         series = self.__date_series.dt.isocalendar().week
         return column, series
 
+    @date_column("Woche_Jahr_Text")
     def column_week_year_text(self) -> tuple[str, pd.Series]:
         column = "Woche_Jahr_Text"
-        series = self.__date_series.apply(
-            lambda x: f"Woche {x.isocalendar()[1]}, {x.isocalendar()[0]}"
-        )
+        calendar = self.__date_series.dt.isocalendar()
+        years = calendar.year.astype("int64")
+        weeks = calendar.week.astype("int64")
+        first_year = years.min()
+        names = [
+            f"Woche {week}, {year}"
+            for year in range(first_year, years.max() + 1)
+            for week in range(1, 54)
+        ]
+        series = self.__lookup(names, 53 * (years - first_year) + weeks - 1)
         return column, series
 
+    @date_column("Tag_im_Monat")
     def column_day_month(self) -> tuple[str, pd.Series]:
         column = "Tag_im_Monat"
         series = self.__date_series.dt.day
         return column, series
 
+    @date_column("Tag_im_Monat_Text", depends=("Tag_im_Monat",))
     def column_day_month_text(self) -> tuple[str, pd.Series]:
         column = "Tag_im_Monat_Text"
-        series = self.__date_series.apply(lambda x: f"{x.day:02d}")
+        names = [f"{day:02d}" for day in range(1, 32)]
+        series = self.__lookup(names, self.column("Tag_im_Monat") - 1)
+        return column, series
+
+    @date_column("Tag_Name_Kurz")
+    def column_day_name_short(self, language: Optional[str] = None) -> tuple[str, pd.Series]:
+        column = language_column("Tag_Name_Kurz", language)
+        series = self.__lookup(self.__names("day_short", language), self.__date_series.dt.dayofweek)
+        return column, series
+
+    @date_column("Tag_Name_Lang")
+    def column_day_name_long(self, language: Optional[str] = None) -> tuple[str, pd.Series]:
+        column = language_column("Tag_Name_Lang", language)
+        series = self.__lookup(self.__names("day_long", language), self.__date_series.dt.dayofweek)
+        return column, series
+
+    @date_column("Geschaeftsjahr", depends=("Jahr", "Monat"), default=False)
+    def column_fiscal_year(self) -> tuple[str, pd.Series]:
+        column = "Geschaeftsjahr"
+        series = self.column("Jahr")
+
+        if self.__fiscal_year_start > 1:
+            series = series + (self.column("Monat") >= self.__fiscal_year_start)
+
+        return column, series
+
+    @date_column("Geschaeftsperiode", depends=("Monat",), default=False)
+    def column_fiscal_period(self) -> tuple[str, pd.Series]:
+        column = "Geschaeftsperiode"
+        series = (self.column("Monat") - self.__fiscal_year_start) % 12 + 1
+        return column, series
+
+    @date_column("Geschaeftsquartal", depends=("Geschaeftsperiode",), default=False)
+    def column_fiscal_quarter(self) -> tuple[str, pd.Series]:
+        column = "Geschaeftsquartal"
+        series = (self.column("Geschaeftsperiode") - 1) // 3 + 1
         return column, series
 
-    def column_day_name_short(self) -> tuple[str, pd.Series]:
-        column = "Tag_Name_Kurz"
-        series = self.__date_series.dt.strftime("%a")
+    @date_column("Retail_Jahr", default=False)
+    def column_retail_year(self) -> tuple[str, pd.Series]:
+        column = "Retail_Jahr"
+        series = pd.Series(self.__retail()[column], index=self.__date_series.index)
         return column, series
 
-    def column_day_name_long(self) -> tuple[str, pd.Series]:
-        column = "Tag_Name_Lang"
-        series = self.__date_series.dt.strftime("%A")
+    @date_column("Retail_Quartal", default=False)
+    def column_retail_quarter(self) -> tuple[str, pd.Series]:
+        column = "Retail_Quartal"
+        series = pd.Series(self.__retail()[column], index=self.__date_series.index)
         return column, series
 
-    def column_is_holiday_bw(self) -> tuple[str, pd.Series]:
-        column = "Feiertag_BW"
-        series = self.__date_series.isin(self.__ger_holiday)
+    @date_column("Retail_Periode", default=False)
+    def column_retail_period(self) -> tuple[str, pd.Series]:
+        column = "Retail_Periode"
+        series = pd.Series(self.__retail()[column], index=self.__date_series.index)
         return column, series
 
-    def column_holiday_name_bw(self) -> tuple[str, pd.Series]:
-        column = "Feiertag_Name_BW"
-        series = self.__date_series.apply(lambda x: f"{self.__ger_holiday.get(x)}")
+    @date_column("Retail_Woche", default=False)
+    def column_retail_week(self) -> tuple[str, pd.Series]:
+        column = "Retail_Woche"
+        series = pd.Series(self.__retail()[column], index=self.__date_series.index)
         return column, series
 
+    @date_column("Retail_Wochen_Jahr", default=False)
+    def column_retail_weeks_year(self) -> tuple[str, pd.Series]:
+        column = "Retail_Wochen_Jahr"
+        series = pd.Series(self.__retail()[column], index=self.__date_series.index)
+        return column, series
+
+    def __column_is_holiday(self, suffix: str) -> tuple[str, pd.Series]:
+        column = f"Feiertag_{suffix}"
+        _, found, _ = self.__holidays(suffix)
+        series = pd.Series(found, index=self.__date_series.index)
+        return column, series
+
+    def __column_holiday_name(self, suffix: str) -> tuple[str, pd.Series]:
+        column = f"Feiertag_Name_{suffix}"
+        index, found, positions = self.__holidays(suffix)
+
+        # Dates without a holiday are named "None"
+        names = np.append(index.names.astype(object), "None")
+        series = self.__lookup(names, pd.Series(np.where(found, positions, len(index.names))))
+        return column, series
+
+    def __names(self, table: str, language: Optional[str]) -> list[str]:
+        """
+        Returns a name table of the given language, by default of the first language.
+        """
+        return DATE_NAMES[language or self.__languages[0]][table]
+
+    def __lookup(self, names: Iterable[str], codes: pd.Series) -> pd.Series:
+        """
+        Maps integer codes to precomputed names, replacing per-row string formatting.
+        """
+        values = np.array(names, dtype=object).take(codes.to_numpy())
+        return pd.Series(values, index=self.__date_series.index)
+
+
+def extend_date_dimension(
+        filename: str,
+        end: datetime.date,
+        holiday_regions: Iterable[tuple[str, Optional[str]]] = DEFAULT_HOLIDAY_REGIONS,
+        holiday_cache_dir: Optional[str] = HOLIDAY_CACHE_DIR,
+        chunk_years: int = 10,
+        languages: Iterable[str] = DEFAULT_LANGUAGES,
+        fiscal_year_start: int = 1,
+        retail_calendar: RetailCalendar = RetailCalendar()
+) -> tuple[int, int]:
+    """
+    Extends an existing date dimension file (CSV or Parquet) up to end with
+    the columns of the file. The dates after the largest Datum_Key are
+    appended, existing rows are kept and only their holiday columns are
+    patched if the holidays changed since the file was built. A CSV file
+    without patched rows is appended to, otherwise the file is replaced.
+    Returns the number of appended and patched rows.
+    """
+    holiday_regions = list(holiday_regions)
+    languages = list(languages)
+    parquet = filename.endswith(".parquet")
+
+    if parquet:
+        existing = pd.read_parquet(filename)
+    else:
+        # Read as text, so unchanged rows are written back exactly as they are
+        existing = pd.read_csv(filename, dtype=str, keep_default_na=False)
+
+    if existing.empty:
+        raise ValueError(f"The date dimension {filename} has no rows to extend")
+
+    columns = list(existing.columns)
+    keys = existing[DimDate.KEY_COLUMN].astype("int64").to_numpy()
+    first_date = datetime.datetime.strptime(str(keys.min()), "%Y%m%d").date()
+    last_date = datetime.datetime.strptime(str(keys.max()), "%Y%m%d").date()
+
+    # Compare dates only, end may also be given as datetime like by the command line
+    if isinstance(end, datetime.datetime):
+        end = end.date()
+
+    holiday_years = (first_date.year, max(last_date.year, end.year))
+    holiday_columns = [column for column in columns if column.startswith("Feiertag_")]
+    changed = np.zeros(len(keys), dtype=bool)
+
+    if holiday_columns:
+        current = DimDate(
+            start=first_date,
+            end=last_date,
+            columns=holiday_columns,
+            holiday_regions=holiday_regions,
+            holiday_cache_dir=holiday_cache_dir,
+            holiday_years=holiday_years,
+            languages=languages,
+            fiscal_year_start=fiscal_year_start,
+            retail_calendar=retail_calendar
+        ).dataframe.set_index(DimDate.KEY_COLUMN).reindex(keys)
+
+        for column in holiday_columns:
+            values = current[column].to_numpy() if parquet else current[column].astype(str).to_numpy()
+            differs = values != existing[column].to_numpy()
+
+            if differs.any():
+                existing[column] = np.where(differs, values, existing[column].to_numpy())
+                changed |= differs
+
+    chunks = iter(())
+
+    if end > last_date:
+        chunks = DimDate(
+            start=last_date + datetime.timedelta(days=1),
+            end=end,
+            columns=columns,
+            holiday_regions=holiday_regions,
+            holiday_cache_dir=holiday_cache_dir,
+            holiday_years=holiday_years,
+            languages=languages,
+            fiscal_year_start=fiscal_year_start,
+            retail_calendar=retail_calendar
+        ).iter_chunks(years=chunk_years)
+
+    if not parquet and not changed.any():
+        appended = 0
+
+        with open(filename, "a", encoding="utf-8", newline="") as file:
+            for chunk in chunks:
+                chunk.to_csv(file, header=False, index=False)
+                appended += len(chunk.index)
+
+        return appended, 0
+
+    handle, temp_file = tempfile.mkstemp(
+        suffix=os.path.splitext(filename)[1], dir=os.path.dirname(os.path.abspath(filename))
+    )
+    os.close(handle)
+
+    try:
+        rows = write_chunks(itertools.chain([existing], chunks), temp_file)
+        os.replace(temp_file, filename)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+    return rows - len(existing.index), int(changed.sum())
+
 
 def main() -> None:
     """
@@ -171,6 +848,76 @@ def main() -> None:
         help="Ending date for the date dimension. Default is 31.12.2049",
         metavar="DATE"
     )
+    parser.add_argument(
+        "--columns",
+        dest="columns",
+        help="Comma separated list of columns to build. Default are the columns "
+        + ", ".join(DimDate.available_columns(optional=False)) + ", the holiday columns of further regions "
+        + "and the name columns of further languages. Further columns are "
+        + ", ".join(set(DimDate.available_columns()) - set(DimDate.available_columns(optional=False))),
+        metavar="COLUMNS"
+    )
+    parser.add_argument(
+        "--holidays",
+        dest="holiday_regions",
+        default="DE-BW",
+        help="Comma separated list of regions for the holiday columns, given as "
+        + "country or country-subdivision like DE-BW,DE-BY,AT. Default is DE-BW",
+        metavar="REGIONS"
+    )
+    parser.add_argument(
+        "--chunk-years",
+        dest="chunk_years",
+        type=int,
+        default=10,
+        help="Number of years built and written at a time. Default is 10",
+        metavar="YEARS"
+    )
+    parser.add_argument(
+        "--languages",
+        dest="languages",
+        default="de",
+        help="Comma separated list of languages of the month and day names, further "
+        + "languages add suffixed columns. Available are "
+        + ", ".join(DATE_NAMES) + ". Default is de",
+        metavar="LANGUAGES"
+    )
+    parser.add_argument(
+        "--extend",
+        dest="extend",
+        action="store_true",
+        help="Extend the existing file given with -f/--file up to the ending date "
+        + "instead of building the date dimension from the starting date"
+    )
+    parser.add_argument(
+        "--fiscal-year-start",
+        dest="fiscal_year_start",
+        type=int,
+        default=1,
+        help="Month in which the fiscal year starts. Default is 1",
+        metavar="MONTH"
+    )
+    parser.add_argument(
+        "--retail-pattern",
+        dest="retail_pattern",
+        default="4-4-5",
+        choices=list(RETAIL_PATTERNS),
+        help="Weeks per period of a quarter in the retail calendar. Default is 4-4-5"
+    )
+    parser.add_argument(
+        "--retail-year-end",
+        dest="retail_year_end",
+        type=int,
+        default=12,
+        help="Month in which the retail year ends on the Saturday nearest to its end. Default is 12",
+        metavar="MONTH"
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Print the time, rows and memory of building every column"
+    )
     args = parser.parse_args()
 
     try:
@@ -183,15 +930,37 @@ def main() -> None:
         )
         parser.print_help()
     else:
-        locale.setlocale(locale.LC_TIME, 'de_DE.UTF-8')
-        dim_date = DimDate(start=date_from, end=date_till)
-
-        if args.filename.endswith(".csv"):
-            dim_date.dataframe.to_csv(args.filename, index=False)
-        elif args.filename.endswith(".parquet"):
-            dim_date.dataframe.to_parquet(args.filename)
-        else:
-            dim_date.dataframe.to_csv("Dim_Kalendertag.csv", index=False)
+        options = {
+            "holiday_regions": parse_holiday_regions(args.holiday_regions),
+            "languages": args.languages.split(","),
+            "fiscal_year_start": args.fiscal_year_start,
+            "retail_calendar": RetailCalendar(pattern=args.retail_pattern, end_month=args.retail_year_end)
+        }
+
+        if args.extend:
+            if not args.filename or not os.path.isfile(args.filename):
+                print(f"Unable to extend the date dimension, the file {args.filename} does not exist.")
+                parser.print_help()
+                return
+
+            appended, patched = extend_date_dimension(
+                args.filename, date_till, chunk_years=args.chunk_years, **options
+            )
+            print(f"Appended {appended} rows and patched {patched} rows of {args.filename}")
+            return
+
+        columns = args.columns.split(",") if args.columns else None
+        profiler = Profiler() if args.profile else None
+        dim_date = DimDate(start=date_from, end=date_till, columns=columns, profiler=profiler, **options)
+        filename = args.filename
+
+        if not filename or not filename.endswith((".csv", ".parquet")):
+            filename = "Dim_Kalendertag.csv"
+
+        write_chunks(dim_date.iter_chunks(years=args.chunk_years), filename)
+
+        if profiler is not None:
+            print(profiler.report())
 
 
 if __name__ == "__main__":
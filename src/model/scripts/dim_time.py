@@ -1,24 +1,68 @@
 import argparse
-import locale
+import functools
+import numpy as np
+import os
 import pandas as pd
+import sys
+from typing import (
+    Iterator,
+    Optional
+)
+
+# Run as a file instead of python -m src.model.scripts.dim_time: resolve the package imports
+# from the root of the repository
+if __name__ == "__main__" and not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+    __package__ = "src.model.scripts"
+
+from ...profiling import (
+    Profiler,
+    profile_stage
+)
+from .export import write_chunks
 
 
 class DimTime:
-    HOURS = [i for i in range(0, 24)]
-    MINUTES = [i for i in range(0, 60)]
-    SECONDS = [i for i in range(0, 60)]
+    GRAINS = {
+        "millisecond": 1,
+        "second": 1000,
+        "minute": 60 * 1000,
+        "15-minute": 15 * 60 * 1000
+    }
+    MILLISECONDS_PER_DAY = 24 * 60 * 60 * 1000
 
-    def __init__(self) -> None:
-        data = self.__create_rows()
-        self.__dataframe = pd.DataFrame(data, columns=self.columns)
+    def __init__(self, grain: str = "second", profiler: Optional[Profiler] = None) -> None:
+        """
+        Prepares a time dimension with one row per grain of a day. The rows
+        are built column-wise on first access of the dataframe. With a
+        profiler the building of every chunk is measured as a stage.
+        """
+        if grain not in self.GRAINS:
+            raise ValueError(f"Unknown grain {grain!r}, expected one of: {', '.join(self.GRAINS)}")
+
+        self.__grain = grain
+        self.__step = self.GRAINS[grain]
+        self.__dataframe = None
+        self.__profiler = profiler
 
     @property
     def dataframe(self) -> pd.DataFrame:
+        if self.__dataframe is None:
+            self.__dataframe = self.__create_frame(0, self.rows)
+
         return self.__dataframe
 
+    @property
+    def grain(self) -> str:
+        return self.__grain
+
+    @property
+    def rows(self) -> int:
+        return self.MILLISECONDS_PER_DAY // self.__step
+
     @property
     def columns(self) -> list[str]:
-        return [
+        columns = [
             "Zeit_Key",
             "Stunde_Format_24",
             "Stunde_Format_24_Text",
@@ -35,30 +79,89 @@ class DimTime:
             "Zeit_Lang_Text"
         ]
 
-    def __create_rows(self) -> list[list]:
-        rows = []
-
-        for hour in self.HOURS:
-            for minute in self.MINUTES:
-                for second in self.SECONDS:
-                    rows.append([
-                        10000 * hour + 100 * minute + second,
-                        hour,
-                        f"{hour:02d}",
-                        f"{hour:02d}:00",
-                        f"{hour:02d}:00:00",
-                        hour * 100 + minute,
-                        minute,
-                        f"{minute:02d}",
-                        f"{hour:02d}:{minute:02d}",
-                        f"{hour:02d}:{minute:02d}:00",
-                        second,
-                        f"{second:02d}",
-                        f"{hour:02d}:{minute:02d}:{second:02d}",
-                        f"{hour:02d}:{minute:02d}:{second:02d}.000"
-                    ])
-
-        return rows
+        if self.__grain == "millisecond":
+            columns.insert(columns.index("Zeit_Kurz_Text"), "Millisekunde")
+
+        return columns
+
+    def iter_chunks(self, chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+        """
+        Yields the dataframe in chunks of at most chunk_rows rows. Only one
+        chunk is held in memory.
+        """
+        for first_row in range(0, self.rows, chunk_rows):
+            yield self.__create_frame(first_row, min(first_row + chunk_rows, self.rows))
+
+    def __create_frame(self, first_row: int, last_row: int) -> pd.DataFrame:
+        """
+        Builds the rows first_row to last_row (exclusive). Numbers are derived
+        from the milliseconds of the day, texts are looked up in small tables
+        of precomputed names.
+        """
+        with profile_stage(self.__profiler, "time frame", rows_in=last_row - first_row):
+            return self.__build_frame(first_row, last_row)
+
+    def __build_frame(self, first_row: int, last_row: int) -> pd.DataFrame:
+        ticks = np.arange(first_row, last_row, dtype="int64") * self.__step
+        seconds_of_day = ticks // 1000
+        minutes_of_day = ticks // (60 * 1000)
+        hours = ticks // (60 * 60 * 1000)
+        minutes = minutes_of_day % 60
+        seconds = seconds_of_day % 60
+        milliseconds = ticks % 1000
+        time_key = 10000 * hours + 100 * minutes + seconds
+
+        if self.__grain == "millisecond":
+            time_key = 1000 * time_key + milliseconds
+
+        tables = _name_tables()
+        data = {
+            "Zeit_Key": time_key,
+            "Stunde_Format_24": hours,
+            "Stunde_Format_24_Text": tables["two_digits"].take(hours),
+            "Stunde_Format_24_Kurz_Text": tables["hour_short"].take(hours),
+            "Stunde_Format_24_Lang_Text": tables["hour_long"].take(hours),
+            "Minute_Key": 100 * hours + minutes,
+            "Minute": minutes,
+            "Minute_Text": tables["two_digits"].take(minutes),
+            "Minute_Kurz_Text": tables["minute_short"].take(minutes_of_day),
+            "Minute_Lang_Text": tables["minute_long"].take(minutes_of_day),
+            "Sekunde": seconds,
+            "Sekunde_Text": tables["two_digits"].take(seconds),
+            "Millisekunde": milliseconds,
+            "Zeit_Kurz_Text": tables["time_short"].take(seconds_of_day)
+        }
+
+        if self.__grain == "millisecond":
+            data["Zeit_Lang_Text"] = data["Zeit_Kurz_Text"] + tables["millisecond"].take(milliseconds)
+        else:
+            data["Zeit_Lang_Text"] = tables["time_long"].take(seconds_of_day)
+
+        return pd.DataFrame(
+            {column: data[column] for column in self.columns},
+            index=pd.RangeIndex(first_row, last_row)
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _name_tables() -> dict[str, np.ndarray]:
+    """
+    Returns the texts of all hours, minutes and seconds of a day.
+    """
+    minutes_of_day = [(hour, minute) for hour in range(24) for minute in range(60)]
+    seconds_of_day = [(hour, minute, second) for hour, minute in minutes_of_day for second in range(60)]
+    tables = {
+        "two_digits": [f"{value:02d}" for value in range(60)],
+        "hour_short": [f"{hour:02d}:00" for hour in range(24)],
+        "hour_long": [f"{hour:02d}:00:00" for hour in range(24)],
+        "minute_short": [f"{hour:02d}:{minute:02d}" for hour, minute in minutes_of_day],
+        "minute_long": [f"{hour:02d}:{minute:02d}:00" for hour, minute in minutes_of_day],
+        "time_short": [f"{hour:02d}:{minute:02d}:{second:02d}" for hour, minute, second in seconds_of_day],
+        "time_long": [f"{hour:02d}:{minute:02d}:{second:02d}.000" for hour, minute, second in seconds_of_day],
+        "millisecond": [f".{millisecond:03d}" for millisecond in range(1000)]
+    }
+
+    return {name: np.array(values, dtype=object) for name, values in tables.items()}
 
 
 def main() -> None:
@@ -74,17 +177,40 @@ def main() -> None:
         help="Write data to a file",
         metavar="FILE"
     )
+    parser.add_argument(
+        "--grain",
+        dest="grain",
+        default="second",
+        choices=list(DimTime.GRAINS),
+        help="One row per millisecond, second, minute or 15 minutes. Default is second"
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        dest="chunk_rows",
+        type=int,
+        default=1_000_000,
+        help="Number of rows built and written at a time. Default is 1000000",
+        metavar="ROWS"
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Print the time, rows and memory of building every chunk"
+    )
     args = parser.parse_args()
 
-    locale.setlocale(locale.LC_TIME, 'de_DE.UTF-8')
-    dim_date = DimTime()
+    profiler = Profiler() if args.profile else None
+    dim_time = DimTime(grain=args.grain, profiler=profiler)
+    filename = args.filename
+
+    if not filename or not filename.endswith((".csv", ".parquet")):
+        filename = "Dim_Zeit.csv"
+
+    write_chunks(dim_time.iter_chunks(chunk_rows=args.chunk_rows), filename)
 
-    if args.filename.endswith(".csv"):
-        dim_date.dataframe.to_csv(args.filename, index=False)
-    elif args.filename.endswith(".parquet"):
-        dim_date.dataframe.to_parquet(args.filename)
-    else:
-        dim_date.dataframe.to_csv("Dim_Zeit.csv", index=False)
+    if profiler is not None:
+        print(profiler.report())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+import os
+import pandas as pd
+import tempfile
+from typing import (
+    Iterable,
+    Optional
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], filename: str, schema: Optional["pa.Schema"] = None) -> int:
+    """
+    Writes dataframe chunks one after another to a Parquet file, one row
+    group per chunk, if filename ends with .parquet and to a CSV file
+    otherwise. Only one chunk is held in memory at a time. Returns the
+    number of rows written.
+
+    The Parquet schema is taken from the first chunk unless a schema is
+    given, the columns of all chunks are converted to it.
+    """
+    if filename.endswith(".parquet"):
+        return _write_parquet(chunks, filename, schema)
+
+    rows = 0
+
+    with open(filename, "w", encoding="utf-8", newline="") as file:
+        for chunk in chunks:
+            chunk.to_csv(file, header=not rows, index=False)
+            rows += len(chunk.index)
+
+    return rows
+
+
+def _write_parquet(chunks: Iterable[pd.DataFrame], filename: str, schema: Optional["pa.Schema"]) -> int:
+    if pq is None:
+        raise ImportError(f"The pyarrow package is required to write {filename}")
+
+    rows = 0
+    writer = None
+
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                writer = pq.ParquetWriter(filename, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+def write_chunks_atomic(chunks: Iterable[pd.DataFrame], filename: str, schema: Optional["pa.Schema"] = None) -> int:
+    """
+    Writes dataframe chunks like write_chunks to a temporary file next to
+    filename and replaces filename with it when all chunks are written, so
+    readers never see a partly written file. Returns the number of rows
+    written.
+    """
+    handle, temp_file = tempfile.mkstemp(
+        suffix=os.path.splitext(filename)[1],
+        dir=os.path.dirname(os.path.abspath(filename))
+    )
+    os.close(handle)
+
+    try:
+        rows = write_chunks(chunks, temp_file, schema)
+        os.replace(temp_file, filename)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+    return rows
+
+
+def as_strings(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the values of object columns to strings like in a CSV file, so
+    columns mixing strings, dates and numbers can be written to Parquet.
+    """
+    for column in dataframe.columns[dataframe.dtypes == object]:
+        values = dataframe[column]
+        dataframe[column] = values.where(values.isnull(), values.astype(str))
+
+    return dataframe
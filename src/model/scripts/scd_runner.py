@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    NamedTuple,
+    Optional
+)
+
+import pandas as pd
+
+# Run as a file instead of python -m src.model.scripts.scd_runner: resolve the package imports
+# from the root of the repository
+if __name__ == "__main__" and not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+    __package__ = "src.model.scripts"
+
+from ..notebooks.scd import scd_fused
+from .export import (
+    as_strings,
+    write_chunks_atomic
+)
+
+
+class TableConfig(NamedTuple):
+    """
+    A dimension loaded by the runner. target defaults to the dimension file,
+    which is replaced by the result.
+    """
+    name: str
+    dimension: str
+    staging: str
+    key: str
+    scd1_columns: list[str]
+    scd2_columns: list[str]
+    target: Optional[str] = None
+    checksum_method: str = "hash64"
+
+
+class TableStats(NamedTuple):
+    """
+    Outcome of a table, the number of staged keys per action and the rows
+    written. error is set if the table failed.
+    """
+    name: str
+    rows: int = 0
+    inserted: int = 0
+    versioned: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def load_config(filename: str) -> list[TableConfig]:
+    """
+    Reads the tables of a JSON config file like
+
+        {"defaults": {"checksum_method": "hash64"},
+         "tables": [{"name": "customer", "dimension": "dim_customer.csv",
+                     "staging": "stg_customer.csv", "key": "customer_id",
+                     "scd1_columns": ["name"], "scd2_columns": ["city"]}]}
+
+    Values in defaults apply to all tables, files are relative to the
+    directory of the config file.
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        config = json.load(file)
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    tables = []
+
+    for table in config["tables"]:
+        table = {**config.get("defaults", {}), **table}
+
+        for option in ("dimension", "staging", "target"):
+            if table.get(option):
+                table[option] = os.path.join(directory, table[option])
+
+        tables.append(TableConfig(**table))
+
+    return tables
+
+
+def read_table(filename: str) -> pd.DataFrame:
+    """
+    Reads a CSV or Parquet file.
+    """
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+
+    return pd.read_csv(filename, delimiter=",")
+
+
+def run_table(table: TableConfig) -> TableStats:
+    """
+    Applies the SCD Type 1 and Type 2 updates of a table and replaces the
+    target file atomically with the result. Errors are returned in the
+    error of the stats.
+    """
+    start = time.perf_counter()
+
+    try:
+        result = scd_fused(
+            read_table(table.dimension),
+            read_table(table.staging),
+            key=table.key,
+            scd1_columns=table.scd1_columns,
+            scd2_columns=table.scd2_columns,
+            checksum_method=table.checksum_method,
+            raise_errors=True
+        )
+
+        target = table.target or table.dimension
+        dataframe = result.dataframe
+
+        if target.endswith(".parquet"):
+            dataframe = as_strings(dataframe.copy())
+
+        rows = write_chunks_atomic([dataframe], target)
+    except Exception as error:
+        return TableStats(table.name, seconds=time.perf_counter() - start, error=str(error))
+
+    return TableStats(
+        table.name,
+        rows=rows,
+        inserted=result.inserted,
+        versioned=result.scd2,
+        updated=result.scd1,
+        unchanged=result.unchanged,
+        seconds=time.perf_counter() - start
+    )
+
+
+def run_tables(tables: list[TableConfig], processes: Optional[int] = None) -> list[TableStats]:
+    """
+    Loads the tables concurrently in a process pool and returns their stats
+    in the order of the tables. A failed table doesn't stop the others.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(run_table, tables))
+
+
+def print_report(stats: list[TableStats]) -> None:
+    print(
+        f"{'table':<24} {'rows':>10} {'inserted':>9} {'versioned':>9} "
+        + f"{'updated':>9} {'unchanged':>9} {'seconds':>8}"
+    )
+
+    for table in stats:
+        if table.error:
+            print(f"{table.name:<24} failed after {table.seconds:.3f} seconds: {table.error}")
+        else:
+            print(
+                f"{table.name:<24} {table.rows:>10} {table.inserted:>9} {table.versioned:>9} "
+                + f"{table.updated:>9} {table.unchanged:>9} {table.seconds:>8.3f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply the SCD Type 1 and Type 2 updates of all tables of a JSON config "
+        + "file concurrently and report the timings and row counts per table."
+    )
+    parser.add_argument(
+        "config",
+        help="JSON file listing dimension, staging, key, SCD1 and SCD2 columns per table",
+        metavar="CONFIG"
+    )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        dest="processes",
+        type=int,
+        help="Number of tables loaded at a time. Default is the number of CPUs",
+        metavar="N"
+    )
+    parser.add_argument(
+        "--tables",
+        dest="tables",
+        help="Comma separated names of the tables to load. Default is all tables",
+        metavar="NAMES"
+    )
+    parser.add_argument(
+        "--report",
+        dest="report",
+        help="Write the stats of the tables to a JSON file",
+        metavar="FILE"
+    )
+    args = parser.parse_args()
+
+    tables = load_config(args.config)
+
+    if args.tables:
+        names = args.tables.split(",")
+        tables = [table for table in tables if table.name in names]
+
+    start = time.perf_counter()
+    stats = run_tables(tables, processes=args.processes)
+    print_report(stats)
+    print(f"{len(tables)} tables in {time.perf_counter() - start:.3f} seconds")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump([table._asdict() for table in stats], file, indent=2)
+
+    if any(table.error for table in stats):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
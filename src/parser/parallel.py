@@ -0,0 +1,249 @@
+import io
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import xml.parsers.expat
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    BinaryIO,
+    Optional,
+    Union
+)
+
+from .streams import (
+    compression_of,
+    open_compressed
+)
+from .xml_to_csv import XmlToCsv
+
+
+class _ShardReader(io.RawIOBase):
+    """
+    Read-only stream over a prefix, a byte range of a file and a suffix. It
+    presents a shard of a large XML file to the parser as a complete document.
+    """
+    def __init__(self, filename: str, start: int, end: int, prefix: bytes, suffix: bytes) -> None:
+        super().__init__()
+        self._file = open(filename, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = memoryview(prefix)
+        self._suffix = memoryview(suffix)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+
+        if self._remaining:
+            size = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+            self._remaining = self._remaining - size if size else 0
+
+            if size:
+                return size
+
+        size = min(len(buffer), len(self._suffix))
+        buffer[:size] = self._suffix[:size]
+        self._suffix = self._suffix[size:]
+        return size
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _open_elements(header: bytes) -> list[str]:
+    """
+    Returns the qualified names of the elements which are still open at the
+    end of a partial XML document.
+    """
+    stack = []
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = lambda name, attributes: stack.append(name)
+    parser.EndElementHandler = lambda name: stack.pop()
+    parser.Parse(header, False)
+
+    return stack
+
+
+def _shard_boundaries(filename: str, root_tag: str, shard_size: int) -> list[int]:
+    """
+    Returns the byte offsets at which shards start. Each offset points to the
+    start tag of a record, the last offset is the size of the file.
+    """
+    record_tag = root_tag.rpartition(".")[-1].encode()
+    pattern = re.compile(rb"<(?:[\w.\-]+:)?" + re.escape(record_tag) + rb"[\s/>]")
+    size = os.path.getsize(filename)
+
+    if not size:
+        return []
+
+    with open(filename, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        match = pattern.search(data)
+        boundaries = [match.start()] if match else []
+
+        while boundaries and boundaries[-1] + shard_size < size:
+            match = pattern.search(data, boundaries[-1] + shard_size)
+
+            if not match:
+                break
+
+            boundaries.append(match.start())
+
+    return boundaries + [size]
+
+
+def _convert_file(
+        source_file: Union[str, BinaryIO],
+        target_file: str,
+        parser_options: dict[str, Any],
+        convert_options: dict[str, Any]
+) -> bool:
+    parser = XmlToCsv(source_file, target_file, **parser_options)
+    return parser.convert(**convert_options)
+
+
+def _convert_shard(
+        source_file: str,
+        shard: tuple[int, int, bytes, bytes],
+        target_file: str,
+        parser_options: dict[str, Any],
+        convert_options: dict[str, Any]
+) -> bool:
+    with _ShardReader(source_file, *shard) as reader:
+        return _convert_file(io.BufferedReader(reader), target_file, parser_options, convert_options)
+
+
+def convert_files(
+        files: list[tuple[str, str]],
+        root_tag: str,
+        node_tags: list[str],
+        leaf_tags: list[str],
+        filter_node_tags: list[str],
+        buffer_size: int = 1000,
+        show_tags_in_node: bool = False,
+        encoding: str = "utf-8",
+        delimiter: str = ";",
+        backend: str = "etree",
+        processes: Optional[int] = None
+) -> None:
+    """
+    Converts several XML files to CSV files in a process pool. The files are
+    given as pairs of source and target paths.
+    """
+    parser_options = {"encoding": encoding, "delimiter": delimiter, "backend": backend}
+    convert_options = {
+        "root_tag": root_tag,
+        "node_tags": node_tags,
+        "leaf_tags": leaf_tags,
+        "filter_node_tags": filter_node_tags,
+        "buffer_size": buffer_size,
+        "show_tags_in_node": show_tags_in_node
+    }
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_convert_file, source_file, target_file, parser_options, convert_options)
+            for source_file, target_file in files
+        ]
+        failed = [source_file for (source_file, _), future in zip(files, futures) if not future.result()]
+
+    if failed:
+        raise RuntimeError(f"Failed to convert the files: {', '.join(failed)}")
+
+
+def convert_file_sharded(
+        source_file: str,
+        target_file: str,
+        root_tag: str,
+        node_tags: list[str],
+        leaf_tags: list[str],
+        filter_node_tags: list[str],
+        buffer_size: int = 1000,
+        show_tags_in_node: bool = False,
+        encoding: str = "utf-8",
+        delimiter: str = ";",
+        backend: str = "etree",
+        processes: Optional[int] = None,
+        shard_size: int = 64 * 1024 ** 2
+) -> None:
+    """
+    Converts a single large XML file to a CSV file in a process pool.
+
+    The file is split into shards of about shard_size bytes at the start tags
+    of root_tag. Every shard is converted in a worker together with the part
+    of the document in front of the first record, and the partial CSV files
+    are merged in the original order. The records must be the only elements
+    with the local name of root_tag, and the file must use an ASCII-compatible
+    encoding. Compressed files cannot be split and are converted in this
+    process, a compressed target is written according to its suffix.
+    """
+    parser_options = {"encoding": encoding, "delimiter": delimiter, "backend": backend}
+    convert_options = {
+        "root_tag": root_tag,
+        "node_tags": node_tags,
+        "leaf_tags": leaf_tags,
+        "filter_node_tags": filter_node_tags,
+        "buffer_size": buffer_size,
+        "show_tags_in_node": show_tags_in_node,
+        "write_header": False
+    }
+
+    boundaries = _shard_boundaries(source_file, root_tag, shard_size) if not compression_of(source_file) else []
+
+    if len(boundaries) < 3:
+        # Nothing to split, convert the file in this process
+        if not _convert_file(source_file, target_file, parser_options, convert_options | {"write_header": True}):
+            raise RuntimeError(f"Failed to convert the file: {source_file}")
+
+        return
+
+    with open(source_file, "rb") as file:
+        header = file.read(boundaries[0])
+
+    footer = "".join(f"</{name}>" for name in reversed(_open_elements(header))).encode()
+    shards = [
+        (start, end, header, footer if end < boundaries[-1] else b"")
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+    target_directory = os.path.dirname(os.path.abspath(target_file))
+    shard_files = []
+
+    try:
+        for _ in shards:
+            handle, shard_file = tempfile.mkstemp(suffix=".csv", dir=target_directory)
+            os.close(handle)
+            shard_files.append(shard_file)
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(
+                _convert_shard,
+                [source_file] * len(shards),
+                shards,
+                shard_files,
+                [parser_options] * len(shards),
+                [convert_options] * len(shards)
+            )
+
+            with open_compressed(target_file, "wb") as target:
+                target.write((f"{delimiter}".join(node_tags + leaf_tags) + "\n").encode(encoding))
+
+                # Append the shards in order as soon as they are finished
+                for shard_file, result in zip(shard_files, results):
+                    if not result:
+                        raise RuntimeError(f"Failed to convert a shard of the file: {source_file}")
+
+                    with open(shard_file, "rb") as shard:
+                        shutil.copyfileobj(shard, target)
+    finally:
+        for shard_file in shard_files:
+            os.remove(shard_file)
@@ -0,0 +1,127 @@
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+from typing import (
+    IO,
+    Optional,
+    Union
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd"
+}
+
+
+class CountingStream(io.RawIOBase):
+    """
+    Wraps a binary stream and counts the bytes read from or written to it.
+    """
+    def __init__(self, stream: Union[IO[bytes], mmap.mmap]) -> None:
+        super().__init__()
+        self._stream = stream
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        size = self._stream.readinto(buffer)
+        self.count += size
+        return size
+
+    def write(self, data: Union[bytes, memoryview]) -> int:
+        size = self._stream.write(data)
+        self.count += size
+        return size
+
+    def tell(self) -> int:
+        return self.count
+
+    def flush(self) -> None:
+        if not self.closed:
+            self._stream.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                self._stream.close()
+
+
+def compression_of(filename: str) -> Optional[str]:
+    """
+    Returns the compression of a file derived from its suffix, or None for
+    uncompressed files.
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(filename)[1].lower())
+
+
+def open_compressed(filename: str, mode: str, encoding: Optional[str] = None) -> IO:
+    """
+    Opens a file and transparently (de)compresses it based on its suffix.
+    """
+    compression = compression_of(filename)
+    encoding = encoding if "t" in mode else None
+
+    if compression == "gzip":
+        return gzip.open(filename, mode, encoding=encoding)
+
+    if compression == "bz2":
+        return bz2.open(filename, mode, encoding=encoding)
+
+    if compression == "xz":
+        return lzma.open(filename, mode, encoding=encoding)
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError(f"The zstandard package is required to open {filename}")
+
+        return zstandard.open(filename, mode, encoding=encoding)
+
+    return open(filename, mode.replace("t", ""), encoding=encoding)
+
+
+def open_source(
+        filename: str,
+        read_size: int = 1024 ** 2,
+        memory_map: bool = False
+) -> Union[IO[bytes], mmap.mmap]:
+    """
+    Opens an XML file for reading. Compressed files are decompressed on the
+    fly, uncompressed files are read with a buffer of read_size bytes or,
+    with memory_map=True, mapped into memory.
+    """
+    if compression_of(filename):
+        return open_compressed(filename, "rb")
+
+    if memory_map and os.path.getsize(filename):
+        with open(filename, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            data.madvise(mmap.MADV_SEQUENTIAL)
+
+        return data
+
+    return open(filename, "rb", buffering=read_size)
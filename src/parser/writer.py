@@ -0,0 +1,117 @@
+import codecs
+import io
+import queue
+import threading
+from typing import (
+    BinaryIO,
+    Iterable,
+    Optional
+)
+
+
+class BufferedTextWriter:
+    """
+    Collects text lines encoded with encoding in a reusable in-memory buffer
+    and writes them to a binary file whenever the buffer holds more than
+    max_rows lines or max_bytes bytes. With background=True the buffered
+    bytes are handed to a writer thread, so producing lines and writing to
+    disk overlap.
+    """
+    def __init__(
+            self,
+            target: BinaryIO,
+            encoding: str = "utf-8",
+            max_rows: int = 1000,
+            max_bytes: int = 4 * 1024 ** 2,
+            background: bool = False
+    ) -> None:
+        self._target = target
+        # Stateful like a text file, so a BOM is only written at the start
+        self._encode = codecs.getincrementalencoder(encoding)().encode
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._buffer = io.BytesIO()
+        self._rows = 0
+        self._bytes = 0
+        self.flushes = 0
+        self.peak_rows = 0
+        self.peak_bytes = 0
+        self._error: Optional[BaseException] = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+
+        if background:
+            # Two pending chunks at most, so memory stays bounded if the disk is slow
+            self._queue = queue.Queue(maxsize=2)
+            self._thread = threading.Thread(target=self._write_pending, daemon=True)
+            self._thread.start()
+
+    def write_lines(self, lines: Iterable[str]) -> None:
+        """
+        Appends lines to the buffer and flushes it if a budget is exceeded.
+        The lines are encoded together, so the budget counts encoded bytes.
+        """
+        lines = list(lines)
+
+        if not lines:
+            return
+
+        lines.append("")
+        self._bytes += self._buffer.write(self._encode("\n".join(lines)))
+        self._rows += len(lines) - 1
+
+        if self._rows > self._max_rows or self._bytes > self._max_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered lines to the target file and resets the buffer.
+        """
+        if not self._rows:
+            return
+
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self.flushes += 1
+        self.peak_rows = max(self.peak_rows, self._rows)
+        self.peak_bytes = max(self.peak_bytes, self._bytes)
+        self._rows = 0
+        self._bytes = 0
+
+        if self._queue is None:
+            self._target.write(data)
+        else:
+            self._raise_error()
+            self._queue.put(data)
+
+    def close(self) -> None:
+        """
+        Flushes the buffer and waits for the writer thread to finish.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+        self._raise_error()
+
+    def _write_pending(self) -> None:
+        while True:
+            data = self._queue.get()
+
+            if data is None:
+                break
+
+            if self._error is None:
+                try:
+                    self._target.write(data)
+                except BaseException as error:
+                    self._error = error
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
@@ -1,27 +1,307 @@
+import os
+import time
 import xml.etree.ElementTree as Et
+import xml.parsers.expat
+from dataclasses import dataclass
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Iterator,
+    Optional,
+    Union
+)
+
+from ..profiling import Profiler
+from .streams import (
+    CountingStream,
+    compression_of,
+    open_compressed,
+    open_source
+)
+from .writer import BufferedTextWriter
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class _TagNode:
+    """
+    Node of the compiled tag path matcher. Every node represents one dotted
+    tag path and carries the actions to perform when the parser reaches it.
+    """
+    __slots__ = ("children", "path", "is_root", "leaf_index", "node_indices", "active")
+
+    def __init__(self, path: str = "") -> None:
+        self.children: dict[str, "_TagNode"] = {}
+        self.path = path
+        self.is_root = False
+        self.leaf_index = -1
+        self.node_indices: Optional[tuple[int, ...]] = None
+        self.active = False
+
+
+# Shared node for all paths which are not part of any configured tag path
+_NO_MATCH = _TagNode()
+
+
+class _TagPathMatcher:
+    """
+    Trie of the configured tag paths, compiled once per conversion. The parser
+    keeps a stack of trie nodes, so every event is resolved by a dictionary
+    lookup instead of rebuilding and comparing dotted tag names.
+    """
+    def __init__(
+            self,
+            root_tag: str,
+            node_tags: list[str],
+            leaf_tags: list[str],
+            filter_node_tags: list[str]
+    ) -> None:
+        header_columns = node_tags + leaf_tags
+
+        # Columns with the same name share one value in the record
+        self.columns = list(dict.fromkeys(header_columns))
+        column_index = {column: index for index, column in enumerate(self.columns)}
+        self.output_indices = [column_index[column] for column in header_columns]
+
+        self.root = _TagNode()
+        self._add_path(root_tag).is_root = True
+
+        for leaf_tag in leaf_tags:
+            self._add_path(leaf_tag).leaf_index = column_index[leaf_tag]
+
+        for filter_tag in filter_node_tags:
+            self._add_path(filter_tag).node_indices = tuple(
+                column_index[node_tag] for node_tag in node_tags if filter_tag.startswith(node_tag)
+            )
+
+    def _add_path(self, tag_path: str) -> _TagNode:
+        node = self.root
+
+        for tag in tag_path.split("."):
+            child = node.children.get(tag)
+
+            if child is None:
+                path = f"{node.path}.{tag}" if node.path else tag
+                child = node.children[tag] = _TagNode(path)
+
+            node = child
+
+        node.active = True
+        return node
+
+    @staticmethod
+    def child(node: _TagNode, tag: str) -> _TagNode:
+        """
+        Resolves a child node for a raw (possibly namespaced) tag which has not
+        been seen below this node yet and memoizes the result.
+        """
+        local_tag = tag.rpartition("}")[-1]  # Remove XML namespace from tags
+        child = node.children.get(local_tag)
+
+        if child is None and "." in local_tag:
+            # Tag names containing dots are matched piecewise like the dotted path
+            child = node
+            for part in local_tag.split("."):
+                child = child.children.get(part, _NO_MATCH)
+
+        if child is None:
+            child = _NO_MATCH
+
+        if node is not _NO_MATCH:
+            node.children[tag] = child
+
+        return child
+
+
+class _RecordBuilder:
+    """
+    Collects the text of the elements on the configured tag paths into
+    records. Shared by the parser backends, which only resolve the nodes and
+    the text of the elements.
+    """
+    __slots__ = ("empty_record", "format_text", "show_tags_in_node", "record", "records", "started")
+
+    def __init__(self, columns: list[str], format_text: Callable[[str], str], show_tags_in_node: bool) -> None:
+        self.empty_record = [""] * len(columns)
+        self.format_text = format_text
+        self.show_tags_in_node = show_tags_in_node
+        self.record = self.empty_record
+        self.records: list[list[str]] = []
+        self.started = False
+
+    def start(self) -> None:
+        """
+        Starts a new record at a root element, unless a record is open.
+        """
+        if not self.started:
+            self.started = True
+            self.record = self.empty_record.copy()
+
+    def end(self, node: _TagNode, text: Optional[str]) -> bool:
+        """
+        Adds the text of an active element to the open record. Returns True
+        if the element completes the record, which is appended to records.
+        """
+        if not self.started:
+            return False
+
+        elem_data = self.format_text(text)
+        record = self.record
+
+        if elem_data:
+            if node.leaf_index >= 0:
+                record[node.leaf_index] = elem_data
+
+            if node.node_indices is not None:
+                if self.show_tags_in_node:
+                    elem_data = f"{node.path}: {elem_data}"
+
+                for node_index in node.node_indices:
+                    node_data = record[node_index]
+                    record[node_index] = f"{node_data}, {elem_data}" if node_data else elem_data
+
+        if node.is_root:
+            self.started = False
+            self.records.append(record)
+            return True
+
+        return False
+
+
+@dataclass
+class ConversionStats:
+    """
+    Throughput metrics of a conversion. bytes_read is the current offset in
+    the (decompressed) source, bytes_written counts the output before any
+    compression. Parsing time includes the time spent in the progress hook.
+    """
+    events: int = 0
+    records: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    flushes: int = 0
+    parse_seconds: float = 0.0
+    write_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    peak_buffer_rows: int = 0
+    peak_buffer_bytes: int = 0
+    source_size: Optional[int] = None
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed_seconds if self.elapsed_seconds else 0.0
 
 
 class XmlToCsv:
     """
     """
+    BACKENDS = ("etree", "expat", "lxml")
+    BATCH_FORMATS = ("list", "numpy", "arrow")
+    OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+    READ_SIZE = 1024 ** 2
+    RECORD_CHUNK = 256
+    PROGRESS_EVENTS = 65536
+
     def __init__(
             self,
-            source_file: str,
-            target_file: str,
+            source_file: Union[str, BinaryIO],
+            target_file: Optional[str] = None,
             encoding: str = "utf-8",
-            delimiter: str = ";"
+            delimiter: str = ";",
+            backend: str = "etree",
+            output_format: str = "csv",
+            compression: Optional[str] = None,
+            row_group_size: Optional[int] = None,
+            read_size: int = READ_SIZE,
+            memory_map: bool = False,
+            collect_stats: bool = False,
+            progress: Optional[Callable[[ConversionStats], None]] = None,
+            progress_interval: float = 10.0,
+            profiler: Optional[Profiler] = None
     ) -> None:
         """
         Initializes the parser with paths to the input XML file and the output CSV file.
+        The input can also be given as a binary file object. The output file can be
+        omitted if the records are only read with iter_records or iter_batches.
+
+        The backend selects the XML parser: "etree" uses ElementTree's iterparse,
+        "expat" drives the expat parser directly without building elements and
+        "lxml" uses lxml's iterparse if lxml is installed, otherwise "etree".
+
+        The output format "parquet" writes a Parquet file and "arrow" an Arrow IPC
+        file with one string column per tag instead of a CSV file. The compression
+        codec and the maximum row group size apply to these formats only.
+
+        Sources and CSV targets ending in .gz, .bz2, .xz or .zst are transparently
+        (de)compressed. Uncompressed sources are read in chunks of read_size bytes
+        or, with memory_map=True, mapped into memory.
+
+        With collect_stats=True or a progress hook the throughput metrics are
+        collected in the stats attribute. The progress hook is called with the
+        stats about every progress_interval seconds and at the end. With a
+        profiler the stats are collected as well and the parsing and writing
+        time of every conversion are added to it as stages.
         """
-        self._output_buffer: list[str] = []
-        self._context = Et.iterparse(source_file, events=("start", "end"))
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {self.BACKENDS}")
+
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format!r}, expected one of {self.OUTPUT_FORMATS}")
+
         self._delimiter = delimiter
+        self._encoding = encoding
+        self._backend = backend if backend != "lxml" or lxml_etree is not None else "etree"
+        self._output_format = output_format
+        self._compression = compression
+        self._row_group_size = row_group_size
+        self._read_size = read_size
+        self._close_source = isinstance(source_file, str)
+        self._target = None
+        self._target_counter: Optional[CountingStream] = None
+        self._progress = progress
+        self._progress_interval = progress_interval
+        self._progress_time = 0.0
+        self._start_time = 0.0
+        self._profiler = profiler
+        self.stats = ConversionStats() if collect_stats or progress is not None or profiler is not None else None
+
+        if isinstance(source_file, str):
+            self._source = CountingStream(open_source(source_file, read_size, memory_map))
+
+            if self.stats is not None and not compression_of(source_file):
+                self.stats.source_size = os.path.getsize(source_file)
+        else:
+            self._source = CountingStream(source_file)
 
         try:
-            self._target = open(target_file, "w", encoding=encoding)
+            if target_file is not None:
+                # CSV lines are encoded by the writer, so both targets are binary
+                opener = open_compressed if output_format == "csv" else open
+                self._target_counter = CountingStream(opener(target_file, "wb"))
+                self._target = self._target_counter
         except Exception as error:
             print(f"Failed to open the output file. Exception: {error}")
+            self._close()
             raise
 
     def convert(
@@ -31,92 +311,426 @@ class XmlToCsv:
             leaf_tags: list[str],
             filter_node_tags: list[str],
             buffer_size: int = 1000,
-            show_tags_in_node: bool = False
-    ) -> None:
+            show_tags_in_node: bool = False,
+            write_header: bool = True,
+            buffer_bytes: int = 4 * 1024 ** 2,
+            background_writes: bool = False
+    ) -> bool:
         """
-        Converts the XRM file to CSV file.
+        Converts the XRM file to CSV file. Returns False if the conversion failed.
+
+        CSV lines are buffered until more than buffer_size lines or buffer_bytes
+        bytes in the output encoding are collected. With background_writes the buffer is written
+        by a separate thread while parsing continues. For Parquet and Arrow
+        output the buffered records are written as one record batch whenever
+        more than buffer_size records are collected, write_header is not used.
         """
         try:
-            header_columns = node_tags + leaf_tags
-            self._output_buffer.append(f"{self._delimiter}".join(
-                column for column in header_columns
-            ))
-            self._convert(
-                root_tag,
-                node_tags,
-                leaf_tags,
-                filter_node_tags,
-                buffer_size,
-                show_tags_in_node
-            )
+            if self._target is None:
+                raise ValueError("No output file was given to write the CSV file to.")
+
+            matcher = _TagPathMatcher(root_tag, node_tags, leaf_tags, filter_node_tags)
+            self._start_stats()
+
+            if self._output_format == "csv":
+                writer = BufferedTextWriter(
+                    self._target, self._encoding, buffer_size, buffer_bytes, background_writes
+                )
+                self._convert_csv(matcher, writer, show_tags_in_node, write_header)
+            else:
+                self._convert_columnar(matcher, buffer_size, show_tags_in_node)
         except Exception as error:
             print(error)
+            return False
         else:
+            return True
+        finally:
+            self._close()
+            self._finish_stats()
+
+    def _convert_csv(
+            self,
+            matcher: _TagPathMatcher,
+            writer: BufferedTextWriter,
+            show_tags_in_node: bool,
+            write_header: bool
+    ) -> None:
+        output_indices = matcher.output_indices
+        delimiter = self._delimiter
+
+        stats = self.stats
+        write_start = 0.0
+
+        try:
+            if write_header:
+                header_columns = [matcher.columns[index] for index in output_indices]
+                writer.write_lines([f"{delimiter}".join(header_columns)])
+
+            for records in self._parse(matcher, self._format_text, show_tags_in_node):
+                if stats is not None:
+                    write_start = time.perf_counter()
+
+                writer.write_lines(
+                    f"{delimiter}".join(record[index] for index in output_indices)
+                    for record in records
+                )
+
+                if stats is not None:
+                    stats.write_seconds += time.perf_counter() - write_start
+        finally:
             # Write rest from buffer to the target file
-            self._write_buffer()
+            write_start = time.perf_counter()
+            writer.close()
+
+            if stats is not None:
+                stats.write_seconds += time.perf_counter() - write_start
+                stats.flushes = writer.flushes
+                stats.peak_buffer_rows = writer.peak_rows
+                stats.peak_buffer_bytes = writer.peak_bytes
+
+    def _convert_columnar(
+            self,
+            matcher: _TagPathMatcher,
+            buffer_size: int,
+            show_tags_in_node: bool
+    ) -> None:
+        schema = pa.schema([(column, pa.string()) for column in matcher.columns])
+
+        if self._output_format == "parquet":
+            writer = pq.ParquetWriter(self._target, schema, compression=self._compression or "snappy")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self._compression)
+            writer = pa.ipc.new_file(self._target, schema, options=options)
+
+        stats = self.stats
+
+        def write_batch(records: list[list[str]]) -> None:
+            write_start = time.perf_counter()
+            batch = self._to_batch(matcher.columns, records, "arrow")
+
+            if self._output_format == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=self._row_group_size)
+            else:
+                writer.write_batch(batch)
+
+            if stats is not None:
+                stats.write_seconds += time.perf_counter() - write_start
+                stats.flushes += 1
+                stats.peak_buffer_rows = max(stats.peak_buffer_rows, len(records))
+
+        try:
+            buffer = []
+
+            for records in self._parse(matcher, self._normalize_text, show_tags_in_node):
+                buffer.extend(records)
+
+                # Flush buffer as a record batch
+                if len(buffer) > buffer_size:
+                    write_batch(buffer)
+                    buffer = []
+
+            if buffer:
+                write_batch(buffer)
         finally:
-            self._target.close()
+            writer.close()
 
-    def _convert(
+    def iter_records(
             self,
             root_tag: str,
             node_tags: list[str],
             leaf_tags: list[str],
             filter_node_tags: list[str],
-            buffer_size: int,
+            show_tags_in_node: bool = False
+    ) -> Iterator[dict[str, str]]:
+        """
+        Yields one dictionary per record, mapping the node and leaf tags to
+        their text. The text is not escaped for CSV output.
+        """
+        matcher = _TagPathMatcher(root_tag, node_tags, leaf_tags, filter_node_tags)
+        columns = matcher.columns
+        self._start_stats()
+
+        try:
+            for records in self._parse(matcher, self._normalize_text, show_tags_in_node):
+                yield from (dict(zip(columns, record)) for record in records)
+        finally:
+            self._close()
+            self._finish_stats()
+
+    def iter_batches(
+            self,
+            root_tag: str,
+            node_tags: list[str],
+            leaf_tags: list[str],
+            filter_node_tags: list[str],
+            batch_size: int = 1000,
+            show_tags_in_node: bool = False,
+            batch_format: str = "list"
+    ) -> Iterator[Union[dict[str, Any], "pa.RecordBatch"]]:
+        """
+        Yields the records in column-oriented batches of up to batch_size rows.
+
+        With batch_format "list" or "numpy" a batch maps every column to a list
+        or a NumPy object array, with "arrow" a batch is a pyarrow RecordBatch
+        of string columns. A batch can be passed to pd.DataFrame directly.
+        """
+        if batch_format not in self.BATCH_FORMATS:
+            raise ValueError(f"Unknown batch format {batch_format!r}, expected one of {self.BATCH_FORMATS}")
+
+        matcher = _TagPathMatcher(root_tag, node_tags, leaf_tags, filter_node_tags)
+        batch = []
+        self._start_stats()
+
+        try:
+            for records in self._parse(matcher, self._normalize_text, show_tags_in_node):
+                batch.extend(records)
+
+                while len(batch) >= batch_size:
+                    yield self._to_batch(matcher.columns, batch[:batch_size], batch_format)
+                    del batch[:batch_size]
+
+            if batch:
+                yield self._to_batch(matcher.columns, batch, batch_format)
+        finally:
+            self._close()
+            self._finish_stats()
+
+    @staticmethod
+    def _to_batch(
+            columns: list[str],
+            records: list[list[str]],
+            batch_format: str
+    ) -> Union[dict[str, Any], "pa.RecordBatch"]:
+        values = [list(column_values) for column_values in zip(*records)]
+
+        if batch_format == "numpy":
+            return {column: np.array(data, dtype=object) for column, data in zip(columns, values)}
+
+        if batch_format == "arrow":
+            return pa.RecordBatch.from_arrays([pa.array(data, pa.string()) for data in values], names=columns)
+
+        return dict(zip(columns, values))
+
+    def _close(self) -> None:
+        if self._target is not None:
+            self._target.close()
+
+        if self._close_source:
+            self._source.close()
+
+    def _parse(
+            self,
+            matcher: _TagPathMatcher,
+            format_text: Callable[[str], str],
             show_tags_in_node: bool
-    ) -> None:
-        header_columns = node_tags + leaf_tags
-        record_data = {}
-        tag_name = ""
-        started = False
+    ) -> Iterator[list[list[str]]]:
+        """
+        Parses the source and yields the finished records in chunks. A record
+        holds the text of every column in the order of matcher.columns.
+        """
+        if self._backend == "expat":
+            chunks = self._parse_expat(matcher, format_text, show_tags_in_node)
+        else:
+            chunks = self._parse_iterparse(matcher, format_text, show_tags_in_node)
+
+        return chunks if self.stats is None else self._measure_parse(chunks)
+
+    def _measure_parse(self, chunks: Iterator[list[list[str]]]) -> Iterator[list[list[str]]]:
+        """
+        Adds the parsing time and the number of records of every chunk to the stats.
+        """
+        stats = self.stats
 
-        for event, elem in self._context:
+        while True:
+            parse_start = time.perf_counter()
+            records = next(chunks, None)
+            stats.parse_seconds += time.perf_counter() - parse_start
+
+            if records is None:
+                return
+
+            stats.records += len(records)
+            yield records
+
+    def _count_events(self, context: Iterator[tuple[str, Any]]) -> Iterator[tuple[str, Any]]:
+        """
+        Counts the events of an iterparse context and reports the progress.
+        """
+        stats = self.stats
+        count = 0
+
+        for count, item in enumerate(context, 1):
+            yield item
+
+            if not count % self.PROGRESS_EVENTS:
+                stats.events = count
+                self._report_progress()
+
+        stats.events = count
+
+    def _start_stats(self) -> None:
+        self._start_time = time.perf_counter()
+        self._progress_time = self._start_time + self._progress_interval
+
+    def _finish_stats(self) -> None:
+        if self.stats is not None:
+            self._report_progress(force=True)
+
+        if self._profiler is not None:
+            self._profiler.record("xml parse", self.stats.parse_seconds, rows_out=self.stats.records)
+
+            if self._target is not None:
+                self._profiler.record("xml write", self.stats.write_seconds, rows_in=self.stats.records)
+
+    def _report_progress(self, force: bool = False) -> None:
+        """
+        Updates the byte counters and elapsed time and calls the progress hook
+        if the progress interval has passed.
+        """
+        now = time.perf_counter()
+
+        if not force and now < self._progress_time:
+            return
+
+        self._progress_time = now + self._progress_interval
+        self.stats.bytes_read = self._source.count
+        self.stats.bytes_written = self._target_counter.count if self._target_counter is not None else 0
+        self.stats.elapsed_seconds = now - self._start_time
+
+        if self._progress is not None:
+            self._progress(self.stats)
+
+    def _parse_iterparse(
+            self,
+            matcher: _TagPathMatcher,
+            format_text: Callable[[str], str],
+            show_tags_in_node: bool
+    ) -> Iterator[list[list[str]]]:
+        """
+        Parses the file with the iterparse function of ElementTree or lxml.
+        """
+        if self._backend == "lxml":
+            context = lxml_etree.iterparse(
+                self._source, events=("start", "end"), remove_comments=True, remove_pis=True
+            )
+        else:
+            context = Et.iterparse(self._source, events=("start", "end"))
+
+        if self.stats is not None:
+            context = self._count_events(context)
+
+        # lxml keeps cleared elements in the tree, finished records are removed
+        remove_records = self._backend == "lxml"
+        builder = _RecordBuilder(matcher.columns, format_text, show_tags_in_node)
+        stack = [matcher.root]
+
+        for event, elem in context:
             elem: Et.Element
-            tag = elem.tag.rpartition("}")[-1]  # Remove XML namespace from tags
 
             if event == "start":
-                tag_name = ".".join((tag_name, tag)) if tag_name else tag
+                node = stack[-1]
+                child = node.children.get(elem.tag)
 
-                if tag_name == root_tag and not started:
-                    started = True
-                    record_data = {column: "" for column in header_columns}
-            else:
-                elem_data = self._format_text(elem.text)
+                if child is None:
+                    child = matcher.child(node, elem.tag)
 
-                if started and elem_data:
-                    if tag_name in leaf_tags:
-                        record_data[tag_name] = elem_data
+                stack.append(child)
 
-                    if tag_name in filter_node_tags:
-                        if show_tags_in_node:
-                            elem_data = f"{tag_name}: {elem_data}" if elem_data else ""
+                if child.is_root:
+                    builder.start()
+            else:
+                node = stack.pop()
 
-                        for node_tag in filter(tag_name.startswith, node_tags):
-                            node_data = record_data[node_tag]
-                            node_data = f"{node_data}, {elem_data}" if node_data else elem_data
-                            record_data[node_tag] = node_data
+                if node.active and builder.end(node, elem.text):
+                    if remove_records:
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
 
-                if tag_name == root_tag and started:
-                    started = False
-                    self._output_buffer.append(f"{self._delimiter}".join(
-                        record_data[column] for column in header_columns
-                    ))
+                    if len(builder.records) >= self.RECORD_CHUNK:
+                        yield builder.records
+                        builder.records = []
 
-                tag_name = tag_name.rpartition('.' + tag)[0]
                 elem.clear()
 
-            # Flush buffer to disk
-            if len(self._output_buffer) > buffer_size:
-                self._write_buffer()
+        if builder.records:
+            yield builder.records
 
-    def _write_buffer(self) -> None:
+    def _parse_expat(
+            self,
+            matcher: _TagPathMatcher,
+            format_text: Callable[[str], str],
+            show_tags_in_node: bool
+    ) -> Iterator[list[list[str]]]:
         """
-        Writes records from buffer to the target file.
+        Parses the file with expat callbacks. Only the text of elements on a
+        configured tag path is collected, no element objects are created.
         """
-        self._target.write("\n".join(self._output_buffer) + "\n")
-        self.output_buffer = []
+        builder = _RecordBuilder(matcher.columns, format_text, show_tags_in_node)
+        stack = [matcher.root]
+
+        # Text parts of the innermost open element until its first child starts
+        text_stack: list[Optional[list[str]]] = []
+        text_parts: Optional[list[str]] = None
+
+        def start_element(tag: str, _attributes: dict) -> None:
+            nonlocal text_parts
+            node = stack[-1]
+            child = node.children.get(tag)
+
+            if child is None:
+                child = matcher.child(node, tag)
+
+            stack.append(child)
+            text_parts = [] if child.active else None
+            text_stack.append(text_parts)
+
+            if child.is_root:
+                builder.start()
+
+        def end_element(_tag: str) -> None:
+            nonlocal text_parts
+            node = stack.pop()
+            parts = text_stack.pop()
+            text_parts = None
+
+            if node.active:
+                builder.end(node, "".join(parts))
+
+        def character_data(data: str) -> None:
+            if text_parts is not None:
+                text_parts.append(data)
+
+        stats = self.stats
+
+        def counted_start_element(tag: str, attributes: dict) -> None:
+            stats.events += 2  # Start and end event
+            start_element(tag, attributes)
+
+        parser = xml.parsers.expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.StartElementHandler = start_element if stats is None else counted_start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+
+        for data in iter(lambda: self._source.read(self._read_size), b""):
+            parser.Parse(data, False)
+
+            if stats is not None:
+                self._report_progress()
+
+            if builder.records:
+                yield builder.records
+                builder.records = []
+
+        parser.Parse(b"", True)
+
+        if builder.records:
+            yield builder.records
 
     @staticmethod
     def _format_text(text: str) -> str:
         return text.strip().replace("\n", " ").replace('"', r'""') if text else ""
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        return text.strip().replace("\n", " ") if text else ""
@@ -0,0 +1,188 @@
+import contextlib
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    ContextManager,
+    Iterator,
+    Optional
+)
+
+
+@dataclass
+class StageStats:
+    """
+    Metrics of a stage. memory_delta is the change of the resident memory
+    of the process in bytes, if it can be read from /proc. peak_memory is
+    the peak of the memory allocated by Python during the stage, only if
+    memory allocations are traced. Stages run repeatedly are summed up.
+    """
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    memory_delta: Optional[int] = None
+    peak_memory: Optional[int] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        return rows / self.seconds if rows and self.seconds else 0.0
+
+
+def resident_memory() -> Optional[int]:
+    """
+    Returns the resident memory of the process in bytes, None if it can't
+    be read from /proc.
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of the stages of a pipeline. Functions taking an
+    optional profiler wrap their stages with profile_stage, which does
+    nothing without a profiler.
+
+    For every stage the wall time, rows in and out and the memory delta are
+    collected in stages. With trace_memory=True the peak of the memory
+    allocated by Python is traced by tracemalloc, which slows the stages
+    down, with profile=True the stages are profiled by cProfile. callback is
+    called with the metrics of every finished stage.
+    """
+    def __init__(
+            self,
+            callback: Optional[Callable[[StageStats], None]] = None,
+            trace_memory: bool = False,
+            profile: bool = False
+    ) -> None:
+        self.stages: dict[str, StageStats] = {}
+        self._callback = callback
+        self._trace_memory = trace_memory
+        self._profile = cProfile.Profile() if profile else None
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[StageStats]:
+        """
+        Measures the code of a with block as stage name. The yielded metrics
+        can be completed by the block, e.g. with rows_out. Nested stages are
+        measured separately, a nested stage resets the traced peak memory.
+        """
+        stats = StageStats(name, calls=1, rows_in=rows_in)
+
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+            tracemalloc.reset_peak()
+
+        if self._profile is not None and not self._depth:
+            self._profile.enable()
+
+        self._depth += 1
+        memory = resident_memory()
+        start = time.perf_counter()
+
+        try:
+            yield stats
+        finally:
+            stats.seconds = time.perf_counter() - start
+            self._depth -= 1
+
+            if self._profile is not None and not self._depth:
+                self._profile.disable()
+
+            if memory is not None:
+                stats.memory_delta = resident_memory() - memory
+
+            if self._trace_memory:
+                stats.peak_memory = tracemalloc.get_traced_memory()[1]
+
+            self._add(stats)
+
+    def record(
+            self,
+            name: str,
+            seconds: float,
+            rows_in: Optional[int] = None,
+            rows_out: Optional[int] = None
+    ) -> None:
+        """
+        Adds a stage measured by the caller, like the parsing time of a
+        conversion.
+        """
+        self._add(StageStats(name, calls=1, seconds=seconds, rows_in=rows_in, rows_out=rows_out))
+
+    def _add(self, stats: StageStats) -> None:
+        total = self.stages.get(stats.name)
+
+        if total is None:
+            total = self.stages[stats.name] = StageStats(stats.name)
+
+        total.calls += stats.calls
+        total.seconds += stats.seconds
+
+        for field in ("rows_in", "rows_out", "memory_delta"):
+            value = getattr(stats, field)
+
+            if value is not None:
+                setattr(total, field, (getattr(total, field) or 0) + value)
+
+        if stats.peak_memory is not None:
+            total.peak_memory = max(total.peak_memory or 0, stats.peak_memory)
+
+        if self._callback is not None:
+            self._callback(stats)
+
+    def profile_stats(self) -> Optional[pstats.Stats]:
+        """
+        Returns the cProfile statistics of all stages, None without profile=True.
+        """
+        return pstats.Stats(self._profile) if self._profile is not None else None
+
+    def report(self) -> str:
+        """
+        Returns the metrics of all stages as a table.
+        """
+        lines = [
+            f"{'stage':<36} {'calls':>6} {'seconds':>9} {'rows in':>11} {'rows out':>11} "
+            + f"{'memory MiB':>10} {'peak MiB':>9}"
+        ]
+
+        def mib(value: Optional[int]) -> str:
+            return f"{value / 2 ** 20:.1f}" if value is not None else "-"
+
+        for stats in self.stages.values():
+            lines.append(
+                f"{stats.name:<36} {stats.calls:>6} {stats.seconds:>9.3f} "
+                + f"{stats.rows_in if stats.rows_in is not None else '-':>11} "
+                + f"{stats.rows_out if stats.rows_out is not None else '-':>11} "
+                + f"{mib(stats.memory_delta):>10} {mib(stats.peak_memory):>9}"
+            )
+
+        return "\n".join(lines)
+
+
+def profile_stage(
+        profiler: Optional[Profiler],
+        name: str,
+        rows_in: Optional[int] = None
+) -> ContextManager[StageStats]:
+    """
+    Returns profiler.stage(name, rows_in), or a context which only yields
+    unused metrics if profiler is None.
+    """
+    if profiler is None:
+        return contextlib.nullcontext(StageStats(name))
+
+    return profiler.stage(name, rows_in)
@@ -0,0 +1,37 @@
+import datetime
+
+import pytest
+
+from src.model.scripts.dim_date import (
+    DimDate,
+    parse_holiday_regions
+)
+
+
+def test_holiday_regions_sharing_a_suffix_are_rejected() -> None:
+    regions = parse_holiday_regions("DE-BE,BE")
+
+    with pytest.raises(ValueError, match="DE-BE and BE share the column suffix BE"):
+        DimDate(datetime.date(2024, 1, 1), datetime.date(2024, 12, 31), holiday_regions=regions, holiday_cache_dir=None)
+
+    with pytest.raises(ValueError):
+        DimDate.available_columns(holiday_regions=regions)
+
+
+def test_holiday_regions_get_their_own_columns() -> None:
+    regions = parse_holiday_regions("DE-BE,AT,DE-BE")
+    dim_date = DimDate(
+        datetime.date(2024, 3, 1),
+        datetime.date(2024, 10, 31),
+        columns=["Feiertag_BE", "Feiertag_AT"],
+        holiday_regions=regions,
+        holiday_cache_dir=None
+    )
+    dataframe = dim_date.dataframe.set_index(DimDate.KEY_COLUMN)
+
+    assert DimDate.available_columns(holiday_regions=regions, optional=False)[-4:] == [
+        "Feiertag_BE", "Feiertag_Name_BE", "Feiertag_AT", "Feiertag_Name_AT"
+    ]
+    # Women's Day is a holiday in Berlin only, the national holiday in Austria only
+    assert dataframe.loc[[20240308, 20241026], "Feiertag_BE"].tolist() == [True, False]
+    assert dataframe.loc[[20240308, 20241026], "Feiertag_AT"].tolist() == [False, True]
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from src.model.notebooks.scd import (
+    add_scd2_checksum_column,
+    apply_scd_updates,
+    scd_fused
+)
+
+
+def make_dimension() -> pd.DataFrame:
+    return pd.DataFrame({
+        "sk": ["a", "b", "c"],
+        "id": [1, 2, 3],
+        "name": ["Anna", "Ben", "Carl"],
+        "city": ["Stuttgart", "Karlsruhe", "Mannheim"],
+        "effective_from": "2020-01-01",
+        "effective_till": "9999-12-31",
+        "active_flag": 1
+    })
+
+
+def test_checksums_of_another_method_or_columns_are_recalculated() -> None:
+    dimension = add_scd2_checksum_column(make_dimension(), "scd2_checksum", ["city"], method="md5")
+    staging = dimension[["id", "name", "city"]].copy()
+    staging.loc[1, "city"] = "Ulm"
+
+    result = scd_fused(dimension, staging, "id", ["name"], ["city"], checksum_method="hash64")
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (2, 0, 1, 0)
+
+    result = scd_fused(result.dataframe, staging, "id", ["name"], ["name", "city"], checksum_method="hash64")
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (3, 0, 0, 0)
+
+
+def test_duplicate_index_labels_close_only_the_changed_version() -> None:
+    dimension = make_dimension().iloc[:2].set_axis([0, 0], axis=0)
+    staging = pd.DataFrame({"id": [1], "name": ["Anna"], "city": ["Ulm"]})
+
+    result = scd_fused(dimension, staging, "id", ["name"], ["city"])
+    dataframe = result.dataframe.set_index(["id", "active_flag"])
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 0, 1, 0)
+    assert dataframe.loc[(1, 0), "city"] == "Stuttgart"
+    assert dataframe.loc[(1, 1), "city"] == "Ulm"
+    assert dataframe.loc[(2, 1), "city"] == "Karlsruhe"
+    assert dataframe.loc[(2, 1), "effective_till"] == "9999-12-31"
+
+
+def test_apply_scd_updates_prints_only_the_counts(tmp_path, capsys) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    make_dimension().to_csv(dim_file, index=False)
+    pd.DataFrame({"id": [2, 4], "name": ["Ben", "Dora"], "city": ["Ulm", "Ulm"]}).to_csv(stg_file, index=False)
+
+    apply_scd_updates(dim_file, stg_file, "id", ["name"], ["city"])
+
+    assert capsys.readouterr().out == "Unchanged 0, SCD1 0, SCD2 1 and inserted 1 staged keys\n"
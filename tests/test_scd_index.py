@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model.notebooks.scd_index import (
+    ScdIndex,
+    apply_scd_updates_indexed,
+    csv_row_offsets,
+    index_directory
+)
+
+
+def make_dimension(keys: list) -> pd.DataFrame:
+    return pd.DataFrame({
+        "sk": [f"sk{number}" for number in range(len(keys))],
+        "id": keys,
+        "name": [f"Name {key}" for key in keys],
+        "city": "Stuttgart",
+        "effective_from": "2020-01-01",
+        "effective_till": "9999-12-31",
+        "active_flag": 1
+    })
+
+
+@pytest.mark.parametrize("keys, staged_key", [
+    (["K1000", "K2000"], "K10000"),
+    ([1000, 2000], 1000.5)
+])
+def test_staged_key_the_index_dtype_cant_hold_is_new(keys: list, staged_key) -> None:
+    dimension = make_dimension(keys)
+    staging = pd.DataFrame({"id": [staged_key], "name": ["New"], "city": ["Ulm"]})
+    index = ScdIndex.from_dimension(dimension, "id", ["city"])
+
+    result = index.apply(dimension, staging, scd1_columns=["name"])
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 0, 0, 1)
+    assert result.dataframe["active_flag"].tolist() == [1, 1, 1]
+    assert result.dataframe["name"].tolist()[:2] == dimension["name"].tolist()
+    assert result.dataframe["id"].tolist()[2] == staged_key
+
+
+def test_staged_keys_of_another_kind_are_rejected() -> None:
+    dimension = make_dimension([1, 2])
+    index = ScdIndex.from_dimension(dimension, "id", ["city"])
+
+    with pytest.raises(ValueError):
+        index.apply(dimension, pd.DataFrame({"id": ["1"], "name": ["Anna"], "city": ["Ulm"]}))
+
+
+def test_csv_loads_patch_and_append_in_place(tmp_path) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    make_dimension(["K1", "K2", "K3"]).to_csv(dim_file, index=False)
+
+    # The first load builds the index and writes the whole file
+    pd.DataFrame({"id": ["K1"], "name": ["Name K1"], "city": ["Ulm"]}).to_csv(stg_file, index=False)
+    apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+    inode = os.stat(dim_file).st_ino
+
+    # Closing a version keeps its length, so it is patched in place
+    pd.DataFrame({"id": ["K2", "K4"], "name": ["Name K2", "Name K4"], "city": ["Ulm", "Ulm"]}).to_csv(stg_file, index=False)
+    result = apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 0, 1, 1)
+    assert len(result.dataframe.index) == 3
+    assert os.stat(dim_file).st_ino == inode
+
+    # A longer name is written by rewriting the file
+    pd.DataFrame({"id": ["K3"], "name": ["Renamed K3"], "city": ["Stuttgart"]}).to_csv(stg_file, index=False)
+    result = apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 1, 0, 0)
+
+    dimension = pd.read_csv(dim_file).sort_values(["id", "active_flag"]).reset_index(drop=True)
+
+    assert dimension["id"].tolist() == ["K1", "K1", "K2", "K2", "K3", "K4"]
+    assert dimension["active_flag"].tolist() == [0, 1, 0, 1, 1, 1]
+    assert dimension["name"].tolist()[4] == "Renamed K3"
+    assert dimension["city"].tolist() == ["Stuttgart", "Ulm", "Stuttgart", "Ulm", "Stuttgart", "Ulm"]
+    assert (dimension["effective_till"] == "9999-12-31").tolist() == [False, True, False, True, True, True]
+
+    # The stored offsets of the rows match the patched file
+    index = ScdIndex.load(index_directory(dim_file))
+
+    assert index.matches(dim_file, "id", ["city"], "hash64")
+    assert np.array_equal(np.concatenate([index.offsets, index.delta_offsets]), csv_row_offsets(dim_file))
+
+
+def test_index_is_rebuilt_if_another_writer_changes_the_dimension(tmp_path) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    make_dimension(["K1", "K2"]).to_csv(dim_file, index=False)
+    pd.DataFrame({"id": ["K1"], "name": ["Name K1"], "city": ["Ulm"]}).to_csv(stg_file, index=False)
+    apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+
+    # Same number of rows in another order
+    pd.read_csv(dim_file).iloc[::-1].to_csv(dim_file, index=False)
+
+    assert not ScdIndex.load(index_directory(dim_file)).matches(dim_file, "id", ["city"], "hash64")
+
+    pd.DataFrame({"id": ["K2"], "name": ["Name K2"], "city": ["Ulm"]}).to_csv(stg_file, index=False)
+    result = apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+    dimension = pd.read_csv(dim_file)
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 0, 1, 0)
+    assert dimension.groupby("id")["active_flag"].sum().tolist() == [1, 1]
+    assert dimension.loc[dimension["active_flag"] == 1, "city"].tolist() == ["Ulm", "Ulm"]
+
+
+@pytest.mark.parametrize("dim_suffix, stg_suffix", [(".parquet", ".csv"), (".csv", ".parquet")])
+def test_staging_format_is_taken_from_the_staging_file(tmp_path, dim_suffix: str, stg_suffix: str) -> None:
+    dim_file = str(tmp_path / f"dimension{dim_suffix}")
+    stg_file = str(tmp_path / f"staging{stg_suffix}")
+    dimension = make_dimension(["K1", "K2"])
+    staging = pd.DataFrame({"id": ["K2", "K3"], "name": ["Name K2", "Name K3"], "city": ["Ulm", "Ulm"]})
+    getattr(dimension, "to_parquet" if dim_suffix == ".parquet" else "to_csv")(dim_file, index=False)
+    getattr(staging, "to_parquet" if stg_suffix == ".parquet" else "to_csv")(stg_file, index=False)
+
+    result = apply_scd_updates_indexed(dim_file, stg_file, "id", ["name"], ["city"])
+
+    assert (result.unchanged, result.scd1, result.scd2, result.inserted) == (0, 0, 1, 1)
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from src.model.notebooks.scd_partitioned import apply_scd_updates_partitioned
+
+
+@pytest.mark.parametrize("target_suffix", [".parquet", ".csv"])
+def test_more_buckets_than_dimension_rows(tmp_path, target_suffix: str) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    target_file = str(tmp_path / f"target{target_suffix}")
+    pd.DataFrame({
+        "sk": ["a", "b"],
+        "id": [1, 2],
+        "name": ["Anna", "Ben"],
+        "city": ["Stuttgart", "Karlsruhe"],
+        "effective_from": "2020-01-01",
+        "effective_till": "9999-12-31",
+        "active_flag": 1
+    }).to_csv(dim_file, index=False)
+    pd.DataFrame({
+        "id": range(1, 9),
+        "name": [f"Name {key}" for key in range(1, 9)],
+        "city": "Ulm"
+    }).to_csv(stg_file, index=False)
+
+    rows = apply_scd_updates_partitioned(dim_file, stg_file, target_file, "id", ["name"], ["city"], buckets=8, processes=2)
+    dimension = pd.read_parquet(target_file) if target_suffix == ".parquet" else pd.read_csv(target_file)
+
+    assert rows == len(dimension.index) == 10
+    assert dimension["id"].dtype == "int64"
+    assert dimension["active_flag"].dtype == "int64"
+    assert sorted(dimension.loc[dimension["active_flag"] == 1, "id"]) == list(range(1, 9))
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from src.model.scripts.scd_runner import (
+    TableConfig,
+    run_table
+)
+
+
+def test_failed_table_reports_the_error(tmp_path, capsys) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    pd.DataFrame({
+        "sk": ["a", "b"],
+        "id": [1, 2],
+        "name": ["Anna", "Ben"],
+        "city": ["Stuttgart", "Ulm"],
+        "effective_from": "2020-01-01",
+        "effective_till": "9999-12-31",
+        "active_flag": 1
+    }).to_csv(dim_file, index=False)
+    pd.DataFrame({"id": [1, 1], "name": ["Anna", "Anna"], "city": ["Ulm", "Bonn"]}).to_csv(stg_file, index=False)
+
+    stats = run_table(TableConfig("customer", dim_file, stg_file, "id", ["name"], ["city"]))
+
+    assert stats.error == "Merge keys are not unique in right dataset; not a many-to-one merge"
+    assert capsys.readouterr().out == ""
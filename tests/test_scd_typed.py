@@ -0,0 +1,37 @@
+import uuid
+
+import pandas as pd
+
+from src.model.notebooks.scd_typed import (
+    UUID16_DTYPE,
+    apply_scd_updates_typed,
+    read_typed_dimension
+)
+
+
+def test_uuid16_keys_stay_arrow_arrays_through_parquet(tmp_path) -> None:
+    dim_file = str(tmp_path / "dimension.csv")
+    stg_file = str(tmp_path / "staging.csv")
+    target_files = [str(tmp_path / "target_1.parquet"), str(tmp_path / "target_2.parquet")]
+    surrogate_keys = [str(uuid.uuid4()) for _ in range(3)]
+    pd.DataFrame({
+        "sk": surrogate_keys,
+        "id": [1, 2, 3],
+        "name": ["Anna", "Ben", "Carl"],
+        "city": ["Stuttgart", "Karlsruhe", "Mannheim"],
+        "effective_from": "2020-01-01",
+        "effective_till": "9999-12-31",
+        "active_flag": 1
+    }).to_csv(dim_file, index=False)
+    pd.DataFrame({"id": [2, 4], "name": ["Ben", "Dora"], "city": ["Ulm", "Ulm"]}).to_csv(stg_file, index=False)
+
+    result = apply_scd_updates_typed(dim_file, stg_file, target_files[0], "id", ["name"], ["city"], surrogate_key="uuid16")
+    apply_scd_updates_typed(target_files[0], stg_file, target_files[1], "id", ["name"], ["city"], surrogate_key="uuid16")
+    dimension = read_typed_dimension(target_files[1])
+
+    assert result.dataframe["sk"].dtype == UUID16_DTYPE
+    assert dimension["sk"].dtype == UUID16_DTYPE
+    assert dimension["sk"].is_unique
+    assert len(dimension.index) == 5
+    assert {uuid.UUID(value).bytes for value in surrogate_keys} <= set(dimension["sk"])
+    assert all(uuid.UUID(bytes=value).version == 4 for value in pd.read_parquet(target_files[1])["sk"])
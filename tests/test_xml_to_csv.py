@@ -0,0 +1,115 @@
+import filecmp
+import os
+import tracemalloc
+
+import pytest
+
+from src.parser.xml_to_csv import XmlToCsv
+
+
+ROOT_TAG = "export.records.record"
+NODE_TAGS = ["export.records.record.details"]
+LEAF_TAGS = [
+    "export.records.record.id",
+    "export.records.record.header.title"
+]
+FILTER_NODE_TAGS = ["export.records.record.details.level1.item"]
+
+
+def write_xml(filename: str, records: int) -> None:
+    """
+    Writes a generated XML file with nested records.
+    """
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n<export>\n<records>\n')
+
+        for record in range(records):
+            file.write(
+                f"<record><id>{record}</id><header><title>Record \"{record}\"</title></header>"
+                + "<details><level1>"
+                + "".join(f"<item>Item {item}</item><skip>{item}</skip>" for item in range(3))
+                + "</level1></details></record>\n"
+            )
+
+        file.write("</records>\n</export>\n")
+
+
+def convert_traced(source_file: str, target_file: str, background_writes: bool) -> int:
+    """
+    Converts with a buffer of 100 lines and returns the peak of the memory
+    allocated during the conversion.
+    """
+    parser = XmlToCsv(source_file, target_file, backend="expat")
+    tracemalloc.start()
+
+    try:
+        parser.convert(
+            ROOT_TAG,
+            NODE_TAGS,
+            LEAF_TAGS,
+            FILTER_NODE_TAGS,
+            buffer_size=100,
+            background_writes=background_writes
+        )
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("background_writes", [False, True])
+def test_small_buffer_matches_single_flush(tmp_path, background_writes: bool) -> None:
+    peak_memory = {}
+
+    for records in (10_000, 40_000):
+        source_file = str(tmp_path / f"records_{records}.xml")
+        expected_file = str(tmp_path / f"expected_{records}.csv")
+        target_file = str(tmp_path / f"output_{records}.csv")
+        write_xml(source_file, records)
+
+        XmlToCsv(source_file, expected_file).convert(
+            ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=records + 1
+        )
+        peak_memory[records] = convert_traced(source_file, target_file, background_writes)
+
+        assert os.path.getsize(target_file) == os.path.getsize(expected_file)
+        assert filecmp.cmp(expected_file, target_file, shallow=False)
+
+    # The peak is bounded by the buffer and the read chunks, not by the size of the input
+    assert peak_memory[40_000] < 8 * 2 ** 20
+    assert peak_memory[40_000] - peak_memory[10_000] < 2 ** 20
+
+
+def test_buffer_budget_counts_encoded_bytes(tmp_path) -> None:
+    source_file = str(tmp_path / "records.xml")
+    target_file = str(tmp_path / "output.csv")
+
+    with open(source_file, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n<export>\n<records>\n')
+        file.writelines(
+            f"<record><id>{record}</id><header><title>Straße 東京</title></header></record>\n"
+            for record in range(2000)
+        )
+        file.write("</records>\n</export>\n")
+
+    # One flush, the peak of the buffer is the size of the file
+    parser = XmlToCsv(source_file, target_file, backend="expat", collect_stats=True)
+    parser.convert(ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=10_000)
+
+    assert parser.stats.flushes == 1
+    assert parser.stats.peak_buffer_bytes == os.path.getsize(target_file)
+
+    # A 4 KiB read yields about 50 lines of 20 bytes, so the buffer is flushed just above 16 KiB
+    parser = XmlToCsv(source_file, target_file, backend="expat", read_size=4096, collect_stats=True)
+    parser.convert(ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=10_000, buffer_bytes=16 * 1024)
+
+    assert parser.stats.flushes > 1
+    assert 16 * 1024 < parser.stats.peak_buffer_bytes < 18 * 1024
+
+    # The encoding keeps its state over the flushes, a BOM is only written once
+    utf16_file = str(tmp_path / "output_utf16.csv")
+    XmlToCsv(source_file, utf16_file, encoding="utf-16").convert(
+        ROOT_TAG, NODE_TAGS, LEAF_TAGS, FILTER_NODE_TAGS, buffer_size=100
+    )
+
+    with open(utf16_file, "r", encoding="utf-16") as file, open(target_file, "r", encoding="utf-8") as expected:
+        assert file.read() == expected.read()